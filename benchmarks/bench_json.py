@@ -0,0 +1,35 @@
+"""比较标准库 json 与当前 json_codec 后端解析 getUpdates 批次的耗时
+
+用法: python benchmarks/bench_json.py [录制的 getUpdates 响应.json]
+"""
+
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import load_batch_bytes  # noqa: E402
+from src import json_codec  # noqa: E402
+
+
+def main() -> None:
+    raw = load_batch_bytes(sys.argv[1] if len(sys.argv) > 1 else None)
+    doc = json.loads(raw)
+    payload = {"chat_id": -1001234567890, "text": "测试回复 " * 40, "reply_parameters": {"message_id": 42}}
+    number = 200
+    print(f"backend={json_codec.BACKEND} batch={len(doc.get('result', []))} updates, {len(raw)} bytes")
+    cases = [
+        ("loads stdlib", lambda: json.loads(raw)),
+        ("loads codec", lambda: json_codec.loads(raw)),
+        ("dumps stdlib", lambda: json.dumps(payload)),
+        ("dumps codec", lambda: json_codec.dumps(payload)),
+    ]
+    for name, fn in cases:
+        best = min(timeit.repeat(fn, number=number, repeat=5)) / number
+        print(f"{name:<14} {best * 1e6:10.1f} us/op")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""比较 development 与 production 日志配置下每条 update 汇总日志在调用方（事件循环线程）的耗时
+
+用法: python benchmarks/bench_logging.py [日志条数]
+日志写入临时文件以代替终端；sink 与抽样方式与 src/logger.py 的 development / production 配置一致。
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from loguru import logger
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.log_sink import QueueSink  # noqa: E402
+
+FMT = (
+    "<blue>{time:YYYY-MM-DD HH:mm:ss}</blue> | "
+    "<level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
+    "<level>{message}</level>"
+)
+
+
+class _Sampler:
+    def __init__(self, every: int) -> None:
+        self.every = every
+        self.counts = {}
+
+    def __call__(self, key: str) -> bool:
+        """与 src.logger.sampled 相同"""
+        n = self.counts.get(key, 0)
+        self.counts[key] = n + 1
+        return n % self.every == 0
+
+
+def emit(i: int, sampled) -> None:
+    """与 TelegramUpdateHandler._process 中的汇总日志相同"""
+    if sampled("update"):
+        logger.info(
+            "发送到MaiBot处理信息 | chat={} user={} msg={} segs={} lane={} media={} cost={:.0f}ms",
+            -1001234567890,
+            10000 + i % 5000,
+            i,
+            3,
+            "ambient",
+            "full",
+            1.5,
+        )
+
+
+def legacy(i: int, _sampled) -> None:
+    """改动前：每条 update 一行无上下文的 INFO"""
+    logger.info("发送到MaiBot处理信息")
+
+
+def run(name: str, fn, sink_kind: str, every: int, size: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.log")
+        logger.remove()
+        if sink_kind == "sync":
+            logger.add(path, level="INFO", format=FMT, enqueue=False, encoding="utf-8")
+        elif sink_kind == "enqueue":
+            logger.add(path, level="INFO", format=FMT, enqueue=True, encoding="utf-8")
+        else:
+            stream = open(path, "w", encoding="utf-8")
+            logger.add(QueueSink(stream.write, stream.flush, stream.close), level="INFO", format=FMT, colorize=False)
+        sampled = _Sampler(every)
+        for i in range(200):
+            fn(i, sampled)
+        start = time.perf_counter()
+        for i in range(size):
+            fn(i, sampled)
+        caller = time.perf_counter() - start
+        logger.remove()
+        total = time.perf_counter() - start
+        with open(path, encoding="utf-8") as f:
+            lines = sum(1 for _ in f) - 200 // every
+    print(
+        f"{name:<28} {caller / size * 1e6:8.2f} us/update (caller) "
+        f"{total / size * 1e6:8.2f} us/update (drained) {lines:>7} lines"
+    )
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    run("legacy sync", legacy, "sync", 1, size)
+    run("summary sync", emit, "sync", 1, size)
+    run("summary enqueue=True", emit, "enqueue", 1, size)
+    run("summary queue sink", emit, "queue", 1, size)
+    run("summary queue sink 1/100", emit, "queue", 100, size)
+
+
+if __name__ == "__main__":
+    main()
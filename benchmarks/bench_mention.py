@@ -0,0 +1,122 @@
+"""比较旧版 @ 识别（逐条编译正则、未命中时拼接调试日志）与 MentionMatcher 在群聊语料上的耗时
+
+用法: python benchmarks/bench_mention.py [消息条数]
+日志级别按生产环境设为 INFO，即 DEBUG 日志不输出。
+"""
+
+import os
+import re
+import sys
+import timeit
+
+from loguru import logger
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import BOT_ID, BOT_USERNAME, make_batch  # noqa: E402
+from src.recv_handler.mention import MentionMatcher  # noqa: E402
+
+
+def legacy_entities_have_self(base_text, entities, bot_id, bot_username):
+    if not entities:
+        return False
+    uname_lower = (bot_username or "").lower()
+    for ent in entities:
+        etype = ent.get("type")
+        if etype == "mention":
+            try:
+                offset = int(ent.get("offset", 0))
+                length = int(ent.get("length", 0))
+                token = base_text[offset : offset + length]
+                if uname_lower and token.lower() == f"@{uname_lower}":
+                    logger.debug(f"@识别: mention 实体命中 token='{token}'")
+                    return True
+            except Exception:
+                continue
+        elif etype == "bot_command":
+            try:
+                offset = int(ent.get("offset", 0))
+                length = int(ent.get("length", 0))
+                token = base_text[offset : offset + length]
+                if uname_lower and f"@{uname_lower}" in token.lower():
+                    logger.debug(f"@识别: bot_command 实体命中 token='{token}'")
+                    return True
+            except Exception:
+                continue
+        elif etype == "text_mention":
+            user = ent.get("user") or {}
+            if user.get("id") == bot_id:
+                logger.debug("@识别: text_mention.user.id 命中 bot_id")
+                return True
+    return False
+
+
+def legacy_is_mentioning_self(msg, bot_id, bot_username):
+    """改动前 TelegramUpdateHandler._is_mentioning_self 的实现"""
+    reply_to = msg.get("reply_to_message")
+    if reply_to and reply_to.get("from", {}).get("id") == bot_id:
+        logger.debug("@识别: 命中 reply_to_message.from.id == bot_id")
+        return True
+    text = msg.get("text") or ""
+    entities = msg.get("entities") or []
+    if legacy_entities_have_self(text, entities, bot_id, bot_username):
+        logger.debug("@识别: 命中 entities 中的 mention/text_mention/bot_command")
+        return True
+    caption = msg.get("caption") or ""
+    cap_entities = msg.get("caption_entities") or []
+    if legacy_entities_have_self(caption, cap_entities, bot_id, bot_username):
+        logger.debug("@识别: 命中 caption_entities 中的 mention/text_mention/bot_command")
+        return True
+    if bot_username:
+        pattern = re.compile(rf"@{re.escape(bot_username)}\b", re.IGNORECASE)
+        if (text and pattern.search(text)) or (caption and pattern.search(caption)):
+            logger.debug("@识别: 命中文本兜底 @username 匹配")
+            return True
+    logger.debug(
+        f"@识别: 未命中 | bot_id={bot_id} bot_username={bot_username} "
+        f"text='{text}' entities={entities} caption='{caption}' cap_entities={cap_entities}"
+    )
+    return False
+
+
+def matcher_is_mentioning_self(msg, matcher):
+    """与 TelegramUpdateHandler._is_mentioning_self 当前实现相同的调用方式"""
+    hit = matcher.match(msg)
+    if hit:
+        logger.debug("@识别: 命中 {}", hit)
+        return True
+    logger.debug(
+        "@识别: 未命中 | bot_id={} bot_username={} text={!r} entities={} caption={!r} cap_entities={}",
+        matcher.bot_id,
+        BOT_USERNAME,
+        msg.get("text") or "",
+        msg.get("entities") or [],
+        msg.get("caption") or "",
+        msg.get("caption_entities") or [],
+    )
+    return False
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    logger.remove()
+    logger.add(lambda _: None, level="INFO")
+    messages = [u["message"] for u in make_batch(size)]
+    matcher = MentionMatcher(BOT_ID, BOT_USERNAME)
+
+    legacy = [legacy_is_mentioning_self(m, BOT_ID, BOT_USERNAME) for m in messages]
+    current = [matcher_is_mentioning_self(m, matcher) for m in messages]
+    assert legacy == current, "两种实现的判定结果不一致"
+    print(f"{size} messages, {sum(current)} addressed")
+
+    cases = [
+        ("legacy", lambda: [legacy_is_mentioning_self(m, BOT_ID, BOT_USERNAME) for m in messages]),
+        ("matcher", lambda: [matcher_is_mentioning_self(m, matcher) for m in messages]),
+    ]
+    for name, fn in cases:
+        best = min(timeit.repeat(fn, number=5, repeat=5)) / 5
+        print(f"{name:<8} {best * 1e3:8.2f} ms/batch {best / size * 1e9:8.0f} ns/message")
+
+
+if __name__ == "__main__":
+    main()
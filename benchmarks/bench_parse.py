@@ -0,0 +1,51 @@
+"""比较完整解析与精简解码（tg_schema）处理 getUpdates 批次的耗时与解析结果的内存占用
+
+用法: python benchmarks/bench_parse.py [录制的 getUpdates 响应.json]
+精简解码需要安装 msgspec，未安装时只测试完整解析。
+"""
+
+import gc
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import load_batch_bytes  # noqa: E402
+from src import json_codec, tg_schema  # noqa: E402
+
+
+def full(raw: bytes):
+    return json_codec.loads(raw)
+
+
+def retained_bytes(fn, raw: bytes) -> int:
+    """解析结果存活期间占用的内存（解析过程中的临时对象不计入）"""
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    result = fn(raw)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main() -> None:
+    raw = load_batch_bytes(sys.argv[1] if len(sys.argv) > 1 else None)
+    batch = len(full(raw).get("result", []))
+    print(f"json={json_codec.BACKEND} msgspec={tg_schema.AVAILABLE} batch={batch} updates, {len(raw)} bytes")
+    cases = [("full", full)]
+    if tg_schema.AVAILABLE:
+        cases.append(("msgspec", tg_schema.decode_updates))
+    number = 200
+    for name, fn in cases:
+        best = min(timeit.repeat(lambda fn=fn: fn(raw), number=number, repeat=5)) / number
+        mem = retained_bytes(fn, raw)
+        print(f"{name:<8} {best * 1e6:10.1f} us/batch {mem / 1024:10.1f} KiB retained")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import json
+import random
+from typing import Any, Dict, List, Optional
+
+BOT_USERNAME = "mai_test_bot"
+BOT_ID = 7000000001
+
+_WORDS = (
+    "今天 天气 不错 有人 一起 打游戏 吗 哈哈哈 这个 表情包 太好笑 了 晚上 吃什么 hello world ok lol 确实 离谱".split()
+)
+
+
+def _user(uid: int) -> Dict[str, Any]:
+    return {
+        "id": uid,
+        "is_bot": False,
+        "first_name": f"用户{uid % 1000}",
+        "username": f"user{uid}",
+        "language_code": "zh-hans",
+    }
+
+
+def _text(rng: random.Random) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 30)))
+
+
+def make_update(update_id: int, rng: random.Random) -> Dict[str, Any]:
+    """生成一条接近真实群聊流量的 update：多数为普通文本，少量带 @、回复、图片或贴纸"""
+    chat_id = -1000000000000 - rng.randint(1, 300)
+    uid = rng.randint(10000, 99999)
+    msg: Dict[str, Any] = {
+        "message_id": update_id % 100000,
+        "from": _user(uid),
+        "chat": {"id": chat_id, "title": f"测试群{-chat_id % 1000}", "type": "supergroup"},
+        "date": 1700000000 + update_id,
+    }
+    kind = rng.random()
+    if kind < 0.1:
+        text = f"@{BOT_USERNAME} {_text(rng)}"
+        msg["text"] = text
+        msg["entities"] = [{"offset": 0, "length": len(BOT_USERNAME) + 1, "type": "mention"}]
+    elif kind < 0.2:
+        msg["text"] = _text(rng)
+        msg["reply_to_message"] = {
+            "message_id": update_id % 100000 - 1,
+            "from": _user(uid + 1),
+            "chat": msg["chat"],
+            "date": msg["date"] - 10,
+            "text": _text(rng),
+        }
+    elif kind < 0.3:
+        msg["photo"] = [
+            {
+                "file_id": f"AgACAgUAAxkBAAI{update_id}{s}",
+                "file_unique_id": f"AQAD{update_id}{s}",
+                "file_size": 1000 * s,
+                "width": 90 * s,
+                "height": 90 * s,
+            }
+            for s in (1, 4, 9, 16)
+        ]
+        msg["caption"] = _text(rng)
+    elif kind < 0.4:
+        msg["sticker"] = {
+            "file_id": f"CAACAgUAAxkBAAI{rng.randint(1, 50)}",
+            "file_unique_id": f"AgAD{rng.randint(1, 50)}",
+            "width": 512,
+            "height": 512,
+            "is_animated": False,
+            "is_video": False,
+            "emoji": "😂",
+            "set_name": "funny_pack",
+            "file_size": 30000,
+            "thumbnail": {
+                "file_id": "thumb",
+                "file_unique_id": "thumbu",
+                "file_size": 3000,
+                "width": 128,
+                "height": 128,
+            },
+        }
+    else:
+        text = _text(rng)
+        msg["text"] = text
+        if rng.random() < 0.3:
+            msg["entities"] = [{"offset": 0, "length": min(4, len(text)), "type": "bold"}]
+    return {"update_id": update_id, "message": msg}
+
+
+def make_batch(size: int = 100, seed: int = 0, start: int = 100000) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [make_update(start + i, rng) for i in range(size)]
+
+
+def load_batch_bytes(path: Optional[str] = None, size: int = 100) -> bytes:
+    """读取录制的 getUpdates 响应（完整 JSON 响应体）；未提供时生成合成批次"""
+    if path:
+        with open(path, "rb") as f:
+            return f.read()
+    return json.dumps({"ok": True, "result": make_batch(size)}, ensure_ascii=False).encode("utf-8")
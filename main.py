@@ -1,20 +1,35 @@
 import asyncio
+import secrets
 import signal
 from typing import Optional
 
 from src.logger import logger
 from src.config import global_config
 from src.telegram_client import TelegramClient
+from src.rate_limit import SendScheduler
 from src.mmc_com_layer import mmc_start_com, mmc_stop_com, router
 from src.recv_handler.message_sending import message_send_instance
 from src.recv_handler.message_handler import TelegramUpdateHandler
+from src.recv_handler.dispatcher import UpdateDispatcher
+from src.recv_handler.update_tracker import UpdateTracker
+from src.recv_handler.catchup import BacklogCatchUp
+from src.recv_handler.media_cache import media_cache
+from src.recv_handler.priority_scheduler import priority_scheduler
+from src.recv_handler.load_shedding import load_shedder
+from src.recv_handler.access_control import access_control
+from src.webhook_server import TelegramWebhookServer
 from src.send_handler.tg_sending import TGMessageSender
+from src.send_handler.file_id_cache import file_id_cache
+from src import media_codec, tg_schema
 import src.send_handler.tg_sending as tg_sending
 
 
-async def telegram_poll_loop(handler: TelegramUpdateHandler) -> None:
+async def telegram_poll_loop(
+    handler: TelegramUpdateHandler, dispatcher: UpdateDispatcher, tracker: UpdateTracker
+) -> None:
     tg = handler.tg
-    offset: Optional[int] = None
+    await catch_up(tg, dispatcher, tracker)
+    offset: Optional[int] = tracker.next_offset
     timeout = global_config.telegram_bot.poll_timeout
     allowed = global_config.telegram_bot.allowed_updates
     logger.info("启动 Telegram 轮询...")
@@ -27,7 +42,8 @@ async def telegram_poll_loop(handler: TelegramUpdateHandler) -> None:
                 continue
             for upd in resp.get("result", []):
                 offset = upd.get("update_id", 0) + 1
-                await handler.handle_update(upd)
+                if tracker.accept(upd):
+                    await dispatcher.submit(upd)
         except asyncio.CancelledError:
             raise
         except Exception as e:
@@ -35,17 +51,110 @@ async def telegram_poll_loop(handler: TelegramUpdateHandler) -> None:
             await asyncio.sleep(2)
 
 
+async def catch_up(tg: TelegramClient, dispatcher: UpdateDispatcher, tracker: UpdateTracker) -> None:
+    tg_cfg = global_config.telegram_bot
+    if not tg_cfg.catchup_enabled:
+        return
+    try:
+        await BacklogCatchUp(
+            tg,
+            dispatcher,
+            tracker,
+            horizon=tg_cfg.stale_update_horizon,
+            policy=tg_cfg.stale_update_policy,
+            allowed_updates=tg_cfg.allowed_updates,
+        ).run()
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"追赶积压 update 异常: {e}")
+
+
+async def start_webhook(
+    tg: TelegramClient, dispatcher: UpdateDispatcher, tracker: UpdateTracker
+) -> Optional[TelegramWebhookServer]:
+    tg_cfg = global_config.telegram_bot
+    if not tg_cfg.webhook_url:
+        logger.error("webhook 模式需要配置 telegram_bot.webhook_url")
+        return None
+    secret_token = tg_cfg.webhook_secret_token or secrets.token_urlsafe(32)
+    server = TelegramWebhookServer(
+        dispatcher,
+        host=tg_cfg.webhook_host,
+        port=tg_cfg.webhook_port,
+        path=tg_cfg.webhook_path,
+        secret_token=secret_token,
+        tracker=tracker,
+        compact_updates=tg_cfg.compact_updates,
+    )
+    await server.start()
+    resp = await tg.set_webhook(tg_cfg.webhook_url, secret_token=secret_token, allowed_updates=tg_cfg.allowed_updates)
+    if not resp.get("ok"):
+        logger.error(f"setWebhook失败: {resp}")
+        await server.stop()
+        return None
+    logger.info(f"已设置 Telegram webhook: {tg_cfg.webhook_url}")
+    return server
+
+
+async def stop_webhook(tg: TelegramClient, server: TelegramWebhookServer) -> None:
+    try:
+        resp = await tg.delete_webhook()
+        if not resp.get("ok"):
+            logger.warning(f"deleteWebhook失败: {resp}")
+    except Exception as e:
+        logger.warning(f"移除 Telegram webhook 失败: {e}")
+    await server.stop()
+
+
 async def main() -> None:
     # wire up dependencies
     tg_cfg = global_config.telegram_bot
+    send_scheduler: Optional[SendScheduler] = None
+    if tg_cfg.rate_limit_enabled:
+        send_scheduler = SendScheduler(
+            global_per_second=tg_cfg.rate_limit_global_per_second,
+            chat_per_second=tg_cfg.rate_limit_chat_per_second,
+            group_per_minute=tg_cfg.rate_limit_group_per_minute,
+            max_retries=tg_cfg.send_max_retries,
+        )
+    if tg_cfg.compact_updates and not tg_schema.AVAILABLE:
+        logger.warning("compact_updates 需要安装 msgspec（pip install msgspec），未安装时按完整解析处理")
     tg_client = TelegramClient(
         tg_cfg.token,
         tg_cfg.api_base,
         proxy_url=(tg_cfg.proxy_url if tg_cfg.proxy_enabled and tg_cfg.proxy_url else None),
         proxy_enabled=tg_cfg.proxy_enabled,
         proxy_from_env=tg_cfg.proxy_from_env,
+        file_path_ttl=tg_cfg.file_path_cache_ttl,
+        max_concurrent_downloads=tg_cfg.max_concurrent_downloads,
+        max_download_bytes=tg_cfg.max_download_bytes,
+        send_scheduler=send_scheduler,
+        pool_size=tg_cfg.pool_size,
+        keepalive_timeout=tg_cfg.keepalive_timeout,
+        dns_cache_ttl=tg_cfg.dns_cache_ttl,
+        api_timeout=tg_cfg.api_timeout,
+        download_timeout=tg_cfg.download_timeout,
+        upload_timeout=tg_cfg.upload_timeout,
+        local_mode=tg_cfg.local_mode,
+        local_upload_dir=tg_cfg.local_upload_dir,
+        compact_updates=tg_cfg.compact_updates,
     )
     handler = TelegramUpdateHandler(tg_client)
+    tracker = UpdateTracker(
+        persist_path=tg_cfg.update_state_path or None,
+        commit_interval=tg_cfg.update_commit_interval,
+        dedupe_window=tg_cfg.update_dedupe_window,
+    )
+    # 相册与编辑在聚合批次处理完后才提交进度
+    handler.on_done = tracker.done
+    dispatcher = UpdateDispatcher(
+        handler.handle_update,
+        workers=tg_cfg.dispatch_workers,
+        max_pending=tg_cfg.dispatch_max_pending,
+        max_pending_per_chat=tg_cfg.dispatch_max_pending_per_chat,
+        on_done=tracker.done,
+    )
     # 获取机器人身份，便于识别 @bot 或回复 bot
     try:
         me = await tg_client.get_me()
@@ -59,15 +168,37 @@ async def main() -> None:
             logger.warning(f"getMe 失败: {me}")
     except Exception as e:
         logger.warning(f"获取 Telegram 自身信息失败: {e}")
+    await tg_client.warmup(tg_cfg.warmup_connections)
 
     # bind sender
     # 设置模块级发送器实例，供接收的 handler 读取
     tg_sending.tg_message_sender = TGMessageSender(tg_client)
     message_send_instance.maibot_router = router
+    message_send_instance.start()
+    access_control.start(global_config.chat.reload_interval)
 
-    # start MaiBot router and TG polling
+    # start MaiBot router and TG polling / webhook
     router_task = asyncio.create_task(mmc_start_com())
-    poll_task = asyncio.create_task(telegram_poll_loop(handler))
+    dispatcher.start()
+    # 先重放上次退出时未处理完的 update
+    restored = tracker.restore_pending()
+    if restored:
+        logger.info(f"恢复上次未处理完成的 update: {len(restored)} 条")
+        for upd in restored:
+            await dispatcher.submit(upd)
+    poll_task: Optional[asyncio.Task] = None
+    webhook_server: Optional[TelegramWebhookServer] = None
+    if tg_cfg.mode == "webhook":
+        # 上次退出时已移除 webhook，积压的 update 可先通过 getUpdates 追赶
+        await catch_up(tg_client, dispatcher, tracker)
+        try:
+            webhook_server = await start_webhook(tg_client, dispatcher, tracker)
+        except Exception as e:
+            logger.error(f"启动 webhook 失败: {e}")
+        if webhook_server is None:
+            logger.warning("webhook 未能启用，回退到轮询模式")
+    if webhook_server is None:
+        poll_task = asyncio.create_task(telegram_poll_loop(handler, dispatcher, tracker))
 
     # graceful shutdown on signals
     loop = asyncio.get_running_loop()
@@ -85,9 +216,37 @@ async def main() -> None:
             pass
 
     await stop_event.wait()
-    for t in (poll_task, router_task):
-        t.cancel()
-    await asyncio.gather(*[router_task, poll_task], return_exceptions=True)
+    # 先停止拉取并尽量处理完已派发的 update，再断开 MaiBot 连接
+    if poll_task is not None:
+        poll_task.cancel()
+        await asyncio.gather(poll_task, return_exceptions=True)
+    if webhook_server is not None:
+        await stop_webhook(tg_client, webhook_server)
+    await dispatcher.stop(drain_timeout=5)
+    if dispatcher.hot_chats:
+        logger.info(f"会话待处理 update 超过单会话上限: {dispatcher.hot_chats} 次")
+    await handler.close()
+    await tracker.close()
+    logger.info(f"update 处理进度: {tracker.stats()}")
+    await priority_scheduler.close()
+    if priority_scheduler.enabled:
+        logger.info(f"MaiBot 发送优先级队列统计: {priority_scheduler.stats()}")
+    await message_send_instance.close()
+    logger.info(f"MaiBot 发送缓冲统计: {message_send_instance.stats()}")
+    router_task.cancel()
+    await asyncio.gather(router_task, return_exceptions=True)
+    await access_control.stop()
+    if access_control.drops:
+        logger.info(f"黑白名单丢弃统计: {access_control.stats()}")
+    if load_shedder.enabled:
+        logger.info(f"群组入站限流统计: {load_shedder.stats()}")
+    if media_cache.enabled:
+        logger.info(f"入站媒体缓存统计: {media_cache.stats()}")
+    if send_scheduler is not None:
+        logger.info(f"出站限流统计: {send_scheduler.stats()}")
+    if file_id_cache.enabled:
+        file_id_cache.save()
+        logger.info(f"出站 file_id 缓存统计: {file_id_cache.stats()}")
     # 关闭通信路由与 Telegram 客户端，吞掉取消异常，避免退出时噪声栈
     try:
         await mmc_stop_com()
@@ -102,6 +261,9 @@ async def main() -> None:
         pass
     except Exception as e:
         logger.exception(f"关闭 Telegram 客户端失败: {e}")
+    media_codec.shutdown()
+    # production 下日志经队列写出，退出前等待队列中的日志写完
+    await logger.complete()
 
 
 if __name__ == "__main__":
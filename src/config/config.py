@@ -1,5 +1,5 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 import shutil
 
@@ -13,6 +13,10 @@ from .official_configs import (
     TelegramBotConfig,
     MaiBotServerConfig,
     ChatConfig,
+    MediaCacheConfig,
+    FileIdCacheConfig,
+    PriorityConfig,
+    LoadSheddingConfig,
     DebugConfig,
 )
 
@@ -85,6 +89,10 @@ class Config(ConfigBase):
     maibot_server: MaiBotServerConfig
     chat: ChatConfig
     debug: DebugConfig
+    media_cache: MediaCacheConfig = field(default_factory=MediaCacheConfig)
+    file_id_cache: FileIdCacheConfig = field(default_factory=FileIdCacheConfig)
+    priority: PriorityConfig = field(default_factory=PriorityConfig)
+    load_shedding: LoadSheddingConfig = field(default_factory=LoadSheddingConfig)
 
 
 def load_config(config_path: str) -> Config:
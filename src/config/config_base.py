@@ -63,6 +63,9 @@ class ConfigBase:
             raise TypeError(f"Value {value} not in {allowed}")
 
         if origin is None:
+            # TOML 中的整数写法（如 0、30）用于浮点字段时按浮点处理
+            if field_type is float and isinstance(value, int) and not isinstance(value, bool):
+                return float(value)
             if isinstance(value, field_type):
                 return field_type(value)
             raise TypeError(f"Expected {field_type.__name__}, got {type(value).__name__}")
@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import Literal
+from typing import Literal, Optional
 
 from .config_base import ConfigBase
 
@@ -15,6 +15,47 @@ class TelegramBotConfig(ConfigBase):
     proxy_enabled: bool = False
     proxy_url: str = ""
     proxy_from_env: bool = False
+    dispatch_workers: int = 8
+    dispatch_max_pending: int = 1000
+    dispatch_max_pending_per_chat: int = 100
+    update_state_path: str = "data/update_state.json"
+    update_commit_interval: float = 1.0
+    update_dedupe_window: int = 2048
+    catchup_enabled: bool = True
+    stale_update_horizon: int = 600
+    stale_update_policy: Literal["drop", "skip_media", "summarize", "process"] = "skip_media"
+    album_aggregation: bool = True
+    album_window: float = 0.8
+    album_max_wait: float = 3.0
+    edit_debounce: float = 1.5
+    edit_max_wait: float = 5.0
+    edit_max_age: int = 3600
+    mode: Literal["polling", "webhook"] = "polling"
+    webhook_url: str = ""
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8443
+    webhook_path: str = "/telegram/webhook"
+    webhook_secret_token: str = ""
+    file_path_cache_ttl: int = 3000
+    max_concurrent_downloads: int = 8
+    max_download_bytes: int = 20 * 1024 * 1024
+    rate_limit_enabled: bool = True
+    rate_limit_global_per_second: float = 30.0
+    rate_limit_chat_per_second: float = 1.0
+    rate_limit_group_per_minute: float = 20.0
+    send_max_retries: int = 3
+    codec_inline_threshold: int = 256 * 1024
+    codec_workers: int = 2
+    pool_size: int = 100
+    keepalive_timeout: float = 30.0
+    dns_cache_ttl: int = 300
+    api_timeout: float = 30.0
+    download_timeout: float = 120.0
+    upload_timeout: float = 120.0
+    warmup_connections: int = 2
+    local_mode: bool = False
+    local_upload_dir: str = ""
+    compact_updates: bool = False
 
 
 @dataclass
@@ -22,6 +63,9 @@ class MaiBotServerConfig(ConfigBase):
     platform_name: str = field(default=ADAPTER_PLATFORM, init=False)
     host: str = "localhost"
     port: int = 8000
+    send_buffer_size: int = 1000
+    spill_path: str = "data/maibot_spill.jsonl"
+    retry_interval: float = 2.0
 
 
 @dataclass
@@ -31,6 +75,53 @@ class ChatConfig(ConfigBase):
     private_list_type: Literal["whitelist", "blacklist"] = "whitelist"
     private_list: list[int] = field(default_factory=list)
     ban_user_id: list[int] = field(default_factory=list)
+    reload_interval: float = 5.0
+
+
+@dataclass
+class MediaCacheConfig(ConfigBase):
+    enabled: bool = True
+    memory_max_bytes: int = 64 * 1024 * 1024
+    disk_enabled: bool = False
+    disk_dir: str = "data/media_cache"
+    disk_max_bytes: int = 512 * 1024 * 1024
+
+
+@dataclass
+class FileIdCacheConfig(ConfigBase):
+    enabled: bool = True
+    max_entries: int = 10000
+    persist_path: str = "data/file_id_cache.json"
+
+
+@dataclass
+class PriorityConfig(ConfigBase):
+    enabled: bool = True
+    private_weight: int = 4
+    mention_weight: int = 4
+    ambient_weight: int = 1
+    private_max_queue: int = 200
+    mention_max_queue: int = 200
+    ambient_max_queue: int = 500
+
+
+@dataclass
+class GroupLoadSheddingConfig(ConfigBase):
+    chat_id: int
+    max_messages: Optional[int] = None
+    window: Optional[float] = None
+    sample_ratio: Optional[float] = None
+    over_budget_sample_ratio: Optional[float] = None
+
+
+@dataclass
+class LoadSheddingConfig(ConfigBase):
+    enabled: bool = False
+    max_messages: int = 60
+    window: float = 60.0
+    sample_ratio: float = 1.0
+    over_budget_sample_ratio: float = 0.2
+    groups: list[GroupLoadSheddingConfig] = field(default_factory=list)
 
 
 @dataclass
@@ -44,3 +135,5 @@ class DebugConfig(ConfigBase):
     serialize: bool = False
     backtrace: bool = False
     diagnose: bool = False
+    profile: Literal["development", "production"] = "development"
+    sample_every: int = 100
@@ -0,0 +1,23 @@
+import json
+from typing import Any
+
+# JSON 编解码后端：安装了 orjson 时使用 orjson，否则回退到标准库 json
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def dumps(obj: Any) -> str:
+    """用作 aiohttp ClientSession 的 json_serialize，需返回 str"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads(data: bytes | bytearray | memoryview | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,55 @@
+import asyncio
+import queue
+import sys
+import threading
+from typing import Callable, Optional
+
+
+class QueueSink:
+    """loguru 在调用方完成格式化后把文本放入队列，由后台线程写出；与 enqueue=True 不同，调用方不做序列化与管道写入"""
+
+    def __init__(
+        self,
+        write: Callable[[str], None],
+        flush: Optional[Callable[[], None]] = None,
+        close: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self._write = write
+        self._flush_target = flush
+        self._close = close
+        self._stopped = False
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, message: str) -> None:
+        self._queue.put(message)
+
+    def _run(self) -> None:
+        while True:
+            message = self._queue.get()
+            try:
+                if message is None:
+                    return
+                self._write(message)
+                # 队列写空时才刷新，批量落盘
+                if self._flush_target is not None and self._queue.empty():
+                    self._flush_target()
+            except Exception as e:
+                sys.__stderr__.write(f"日志写出失败: {e}\n")
+            finally:
+                self._queue.task_done()
+
+    async def complete(self) -> None:
+        """等待队列中已有的日志写完（await logger.complete() 时调用）"""
+        await asyncio.to_thread(self._queue.join)
+
+    def stop(self) -> None:
+        # stderr 的两个 handler 共用同一实例，移除时会各调用一次
+        if self._stopped:
+            return
+        self._stopped = True
+        self._queue.put(None)
+        self._thread.join()
+        if self._close is not None:
+            self._close()
@@ -1,9 +1,12 @@
 from loguru import logger
+import copy
 import os
 import sys
 from pathlib import Path
+from typing import Any, Dict, Tuple
 
 from .config import global_config
+from .log_sink import QueueSink
 
 
 def _env_or(default: str, key: str) -> str:
@@ -17,6 +20,42 @@ mm_level = _env_or(getattr(global_config.debug, "maim_message_level", "INFO"), "
 serialize = bool(os.getenv("LOG_SERIALIZE", str(global_config.debug.serialize).lower()) in ("1", "true", "yes"))
 backtrace = getattr(global_config.debug, "backtrace", False)
 diagnose = getattr(global_config.debug, "diagnose", False)
+# production：stderr 与文件日志经内存队列由后台线程写出、不着色，逐条消息的高频 INFO 日志抽样输出
+production = _env_or(getattr(global_config.debug, "profile", "development"), "LOG_PROFILE") == "production"
+sample_every = max(1, getattr(global_config.debug, "sample_every", 100)) if production else 1
+
+_sample_counts: Dict[str, int] = {}
+
+
+def sampled(key: str) -> bool:
+    """同一类高频日志每 sample_every 次返回一次 True（development 下恒为 True）；
+    在调用 logger 之前判断，被跳过的日志不会构造日志记录"""
+    n = _sample_counts.get(key, 0)
+    _sample_counts[key] = n + 1
+    return n % sample_every == 0
+
+
+# 文件 sink 的写出端：独立的 logger 副本（不含任何 handler），在后台线程中负责轮转与清理
+_writer_base = copy.deepcopy(logger)
+
+
+def _file_sink(path: str, rotation: str, retention: str) -> Tuple[Any, Dict[str, Any]]:
+    """返回 (sink, logger.add 的附加参数)"""
+    if not production:
+        return path, {"rotation": rotation, "retention": retention, "enqueue": True, "encoding": "utf-8"}
+    writer = copy.deepcopy(_writer_base)
+    writer.add(path, format="{message}", rotation=rotation, retention=retention, encoding="utf-8", buffering=1)
+    raw = writer.opt(raw=True)
+    return QueueSink(lambda message: raw.info(message), close=writer.remove), {}
+
+
+def _adapter_filter(r) -> bool:
+    return "name" not in r["extra"] or r["extra"].get("name") != "maim_message"
+
+
+def _mm_filter(r) -> bool:
+    return r["extra"].get("name") == "maim_message"
+
 
 common_fmt = (
     "<blue>{time:YYYY-MM-DD HH:mm:ss}</blue> | "
@@ -31,22 +70,25 @@ mm_fmt = (
     "<level>{message}</level>"
 )
 
-# stderr sinks
+# stderr sinks（production 下两个 sink 共用一个写出线程）
+stderr_sink = QueueSink(sys.stderr.write, sys.stderr.flush) if production else sys.stderr
 logger.add(
-    sys.stderr,
+    stderr_sink,
     level=adapter_level,
     format=common_fmt,
+    colorize=False if production else None,
     backtrace=backtrace,
     diagnose=diagnose,
-    filter=lambda r: "name" not in r["extra"] or r["extra"].get("name") != "maim_message",
+    filter=_adapter_filter,
 )
 logger.add(
-    sys.stderr,
+    stderr_sink,
     level=mm_level,
     format=mm_fmt,
+    colorize=False if production else None,
     backtrace=backtrace,
     diagnose=diagnose,
-    filter=lambda r: r["extra"].get("name") == "maim_message",
+    filter=_mm_filter,
 )
 
 # optional file sinks
@@ -55,31 +97,27 @@ if getattr(global_config.debug, "to_file", False):
     Path(file_path).parent.mkdir(parents=True, exist_ok=True)
     rotation = getattr(global_config.debug, "rotation", "10 MB")
     retention = getattr(global_config.debug, "retention", "7 days")
+    adapter_sink, adapter_opts = _file_sink(file_path, rotation, retention)
     logger.add(
-        file_path,
+        adapter_sink,
         level=adapter_level,
         format=common_fmt,
-        rotation=rotation,
-        retention=retention,
-        enqueue=True,
-        encoding="utf-8",
         serialize=serialize,
         backtrace=backtrace,
         diagnose=diagnose,
-        filter=lambda r: "name" not in r["extra"] or r["extra"].get("name") != "maim_message",
+        filter=_adapter_filter,
+        **adapter_opts,
     )
+    mm_sink, mm_opts = _file_sink(file_path.replace(".log", ".mm.log"), rotation, retention)
     logger.add(
-        file_path.replace(".log", ".mm.log"),
+        mm_sink,
         level=mm_level,
         format=mm_fmt,
-        rotation=rotation,
-        retention=retention,
-        enqueue=True,
-        encoding="utf-8",
         serialize=serialize,
         backtrace=backtrace,
         diagnose=diagnose,
-        filter=lambda r: r["extra"].get("name") == "maim_message",
+        filter=_mm_filter,
+        **mm_opts,
     )
 
 custom_logger = logger.bind(name="maim_message")
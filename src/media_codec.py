@@ -0,0 +1,76 @@
+import asyncio
+import base64
+import binascii
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from .config import global_config
+
+T = TypeVar("T")
+
+# 线程中按块编解码：binascii 单次调用期间持有 GIL，分块后事件循环线程可在块之间拿回 GIL
+ENCODE_CHUNK = 3 * 64 * 1024
+DECODE_CHUNK = 4 * 64 * 1024
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(1, global_config.telegram_bot.codec_workers), thread_name_prefix="b64codec"
+        )
+    return _executor
+
+
+async def _run(func: Callable[[T], object], arg: T, size: int):
+    if size < global_config.telegram_bot.codec_inline_threshold:
+        return func(arg)
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), func, arg)
+
+
+def _encode_chunked(data: bytes | bytearray | memoryview | mmap.mmap) -> str:
+    with memoryview(data) as view:
+        # ENCODE_CHUNK 为 3 的倍数，各块编码结果直接拼接即为整体编码；最终只做一次 join 拷贝
+        return "".join(
+            binascii.b2a_base64(view[i : i + ENCODE_CHUNK], newline=False).decode("ascii")
+            for i in range(0, len(view), ENCODE_CHUNK)
+        )
+
+
+def _encode_file(path: str) -> str:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _encode_chunked(mm)
+
+
+def _decode_chunked(b64: str) -> bytes | bytearray:
+    out = bytearray()
+    try:
+        for i in range(0, len(b64), DECODE_CHUNK):
+            out += binascii.a2b_base64(b64[i : i + DECODE_CHUNK])
+    except (binascii.Error, ValueError):
+        # 含换行等非字母表字符时分块边界可能错位，退回整体解码（仍会对真正非法的输入抛错）
+        return base64.b64decode(b64)
+    return out
+
+
+async def b64decode(b64: str) -> bytes | bytearray:
+    return await _run(_decode_chunked, b64, len(b64))
+
+
+async def b64encode_file(path: str) -> str:
+    """内存映射读取本地文件并编码为 base64，始终在线程池中执行（包含磁盘 IO）"""
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), _encode_file, path)
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
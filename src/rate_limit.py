@@ -0,0 +1,169 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .logger import logger
+
+# 统计信息中保留的空闲会话数上限，超出后清理已空闲且令牌已回满的会话
+MAX_IDLE_CHATS = 1024
+
+
+class TokenBucket:
+    """令牌桶；reserve 允许透支，等待时间按预占顺序递增，从而保证先到先得"""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = max(rate, 1e-3)
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        """预占一个令牌，返回需等待的秒数"""
+        self._refill(now)
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+    def try_acquire(self, now: float) -> bool:
+        """有可用令牌时取走一个并返回 True，不透支"""
+        self._refill(now)
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self._tokens >= self.capacity
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class _ChatState:
+    __slots__ = ("lock", "bucket", "group_bucket", "blocked_until", "pending", "throttled", "retries")
+
+    def __init__(self, bucket: TokenBucket, group_bucket: Optional[TokenBucket]) -> None:
+        self.lock = asyncio.Lock()
+        self.bucket = bucket
+        self.group_bucket = group_bucket
+        self.blocked_until = 0.0
+        self.pending = 0
+        self.throttled = 0.0
+        self.retries = 0
+
+
+def _retry_after(result: Dict[str, Any]) -> Optional[float]:
+    if result.get("ok") or result.get("error_code") != 429:
+        return None
+    params = result.get("parameters") or {}
+    try:
+        return float(params.get("retry_after", 1))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def _is_group_chat_id(chat_id: int | str) -> bool:
+    # Telegram 群组/频道的 chat_id 为负数，私聊为正数
+    try:
+        return int(chat_id) < 0
+    except (TypeError, ValueError):
+        return str(chat_id).startswith("@")
+
+
+class SendScheduler:
+    """出站发送调度：全局每秒限额 + 单会话限额 + 群组每分钟限额，并在 429 时按 retry_after 延迟重试
+
+    同一会话的发送按调用顺序串行执行，不同会话之间只受全局限额约束。
+    """
+
+    def __init__(
+        self,
+        *,
+        global_per_second: float = 30,
+        chat_per_second: float = 1.0,
+        group_per_minute: float = 20,
+        max_retries: int = 3,
+    ) -> None:
+        self._global = TokenBucket(global_per_second, global_per_second)
+        self._chat_per_second = chat_per_second
+        self._group_per_minute = group_per_minute
+        self._max_retries = max(0, max_retries)
+        self._chats: Dict[str, _ChatState] = {}
+        self.total_throttled = 0.0
+        self.total_retries = 0
+
+    async def run(self, chat_id: int | str, request: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        key = str(chat_id)
+        state = self._chats.get(key)
+        if state is None:
+            group_bucket = None
+            if _is_group_chat_id(chat_id):
+                group_bucket = TokenBucket(self._group_per_minute / 60, self._group_per_minute)
+            state = _ChatState(TokenBucket(self._chat_per_second, self._chat_per_second), group_bucket)
+            self._chats[key] = state
+        state.pending += 1
+        try:
+            async with state.lock:
+                attempt = 0
+                while True:
+                    await self._acquire(state)
+                    result = await request()
+                    retry_after = _retry_after(result)
+                    if retry_after is None or attempt >= self._max_retries:
+                        return result
+                    attempt += 1
+                    state.retries += 1
+                    self.total_retries += 1
+                    logger.warning(f"Telegram 限流(429)，会话 {key} 将在 {retry_after}s 后重试（第 {attempt} 次）")
+                    state.blocked_until = time.monotonic() + retry_after
+        finally:
+            state.pending -= 1
+            if state.pending == 0 and len(self._chats) > MAX_IDLE_CHATS:
+                self._prune_idle()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "total_throttled_seconds": round(self.total_throttled, 3),
+            "total_retries": self.total_retries,
+            "chats": {
+                key: {
+                    "pending": st.pending,
+                    "throttled_seconds": round(st.throttled, 3),
+                    "retries": st.retries,
+                }
+                for key, st in self._chats.items()
+                if st.pending or st.throttled or st.retries
+            },
+        }
+
+    async def _acquire(self, state: _ChatState) -> None:
+        # 先满足会话级限制，再预占全局令牌，避免等待会话限额期间白占全局额度
+        now = time.monotonic()
+        wait = max(state.blocked_until - now, state.bucket.reserve(now))
+        if state.group_bucket is not None:
+            wait = max(wait, state.group_bucket.reserve(now))
+        await self._sleep(state, wait)
+        now = time.monotonic()
+        await self._sleep(state, self._global.reserve(now))
+
+    async def _sleep(self, state: _ChatState, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        state.throttled += seconds
+        self.total_throttled += seconds
+        await asyncio.sleep(seconds)
+
+    def _prune_idle(self) -> None:
+        now = time.monotonic()
+        for key in [
+            k
+            for k, st in self._chats.items()
+            if st.pending == 0
+            and st.blocked_until <= now
+            and st.bucket.is_full(now)
+            and (st.group_bucket is None or st.group_bucket.is_full(now))
+        ]:
+            del self._chats[key]
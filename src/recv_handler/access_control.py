@@ -0,0 +1,124 @@
+import asyncio
+import os
+import signal
+from collections import Counter
+from typing import Dict, FrozenSet, Hashable, Optional
+
+from ..config import global_config
+from ..config.config import load_config
+from ..config.official_configs import ChatConfig
+from ..logger import logger
+
+CONFIG_PATH = "config.toml"
+
+
+class AccessPolicy:
+    """由 ChatConfig 编译出的不可变黑白名单，判断为 O(1) 的集合查找"""
+
+    __slots__ = ("group_whitelist", "groups", "private_whitelist", "privates", "banned")
+
+    def __init__(
+        self,
+        group_whitelist: bool,
+        groups: FrozenSet[int],
+        private_whitelist: bool,
+        privates: FrozenSet[int],
+        banned: FrozenSet[int],
+    ) -> None:
+        self.group_whitelist = group_whitelist
+        self.groups = groups
+        self.private_whitelist = private_whitelist
+        self.privates = privates
+        self.banned = banned
+
+    @classmethod
+    def from_config(cls, chat: ChatConfig) -> "AccessPolicy":
+        return cls(
+            chat.group_list_type == "whitelist",
+            frozenset(chat.group_list),
+            chat.private_list_type == "whitelist",
+            frozenset(chat.private_list),
+            frozenset(chat.ban_user_id),
+        )
+
+    def deny_reason(self, user_id: Hashable, chat_id: Hashable, is_group: bool) -> Optional[str]:
+        """放行返回 None，否则返回丢弃原因"""
+        if is_group:
+            if (chat_id in self.groups) != self.group_whitelist:
+                return "group_not_whitelisted" if self.group_whitelist else "group_blacklisted"
+        elif (user_id in self.privates) != self.private_whitelist:
+            return "private_not_whitelisted" if self.private_whitelist else "private_blacklisted"
+        if user_id in self.banned:
+            return "user_banned"
+        return None
+
+
+class AccessControl:
+    """持有当前生效的 AccessPolicy；config.toml 变更（轮询 mtime）或收到 SIGHUP 时重新加载并整体替换，无需重启"""
+
+    def __init__(self, chat: ChatConfig, config_path: str = CONFIG_PATH) -> None:
+        self.policy = AccessPolicy.from_config(chat)
+        self.config_path = config_path
+        self.drops: Counter[str] = Counter()
+        self._mtime = self._read_mtime()
+        self._watcher: Optional[asyncio.Task] = None
+        self._reload_lock = asyncio.Lock()
+
+    def allow(self, user_id: Hashable, chat_id: Hashable, is_group: bool) -> bool:
+        reason = self.policy.deny_reason(user_id, chat_id, is_group)
+        if reason is None:
+            return True
+        self.drops[reason] += 1
+        return False
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.drops)
+
+    def start(self, reload_interval: float) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.ensure_future(self.reload()))
+        except (AttributeError, NotImplementedError, RuntimeError):
+            # Windows 没有 SIGHUP
+            pass
+        if reload_interval > 0 and self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch(reload_interval), name="config-watch")
+
+    async def stop(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+
+    async def reload(self) -> bool:
+        """重新读取配置文件中的 [chat]；解析失败时保留当前策略"""
+        async with self._reload_lock:
+            self._mtime = self._read_mtime()
+            try:
+                config = await asyncio.to_thread(load_config, self.config_path)
+            except Exception as e:
+                logger.error(f"重新加载聊天名单失败，沿用当前配置: {e}")
+                return False
+            self.policy = AccessPolicy.from_config(config.chat)
+            global_config.chat = config.chat
+            logger.info(
+                f"已重新加载聊天名单: 群组 {len(self.policy.groups)} 个，私聊 {len(self.policy.privates)} 个，"
+                f"全局黑名单 {len(self.policy.banned)} 个"
+            )
+            return True
+
+    async def _watch(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            mtime = self._read_mtime()
+            if mtime is not None and mtime != self._mtime:
+                await self.reload()
+
+    def _read_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.config_path).st_mtime
+        except OSError:
+            return None
+
+
+access_control = AccessControl(global_config.chat)
@@ -0,0 +1,101 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+from ..logger import logger
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+
+class _Batch(Generic[T]):
+    __slots__ = ("items", "first", "last", "task", "done")
+
+    def __init__(self, now: float) -> None:
+        self.items: List[T] = []
+        self.first = now
+        self.last = now
+        self.task: Optional[asyncio.Task] = None
+        # flush 回调执行完毕（或被取消）后置位
+        self.done = asyncio.Event()
+
+
+class KeyedBatcher(Generic[K, T]):
+    """按键聚合短时间内陆续到达的条目：距最后一条超过 window 秒、距第一条超过 max_wait 秒
+    或条目数达到 max_items 时，整批交给 flush 回调。"""
+
+    def __init__(
+        self,
+        flush: Callable[[K, List[T]], Awaitable[None]],
+        *,
+        window: float,
+        max_wait: float,
+        max_items: int = 0,
+    ) -> None:
+        self._flush = flush
+        self.window = max(0.0, window)
+        self.max_wait = max(self.window, max_wait)
+        self.max_items = max(0, max_items)
+        self._batches: Dict[K, _Batch[T]] = {}
+        # 已摘出、flush 回调仍在执行中的批次
+        self._flushing: Dict[K, List[_Batch[T]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._batches) + len(self._flushing)
+
+    def add(self, key: K, item: T) -> None:
+        now = time.monotonic()
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = _Batch(now)
+            batch.task = asyncio.create_task(self._wait_and_flush(key, batch))
+        batch.items.append(item)
+        batch.last = now
+        if self.max_items and len(batch.items) >= self.max_items:
+            batch.task.cancel()
+            batch.task = asyncio.create_task(self._flush_batch(key, batch))
+
+    async def flush(self, key: K) -> None:
+        """立即处理该键下尚未处理的条目，并等待该键正在进行中的处理完成"""
+        for batch in list(self._flushing.get(key, ())):
+            await batch.done.wait()
+        batch = self._batches.get(key)
+        if batch is not None:
+            batch.task.cancel()
+            await self._flush_batch(key, batch)
+
+    async def flush_matching(self, predicate: Callable[[K], bool]) -> None:
+        for key in [k for k in {**self._flushing, **self._batches} if predicate(k)]:
+            await self.flush(key)
+
+    async def close(self) -> None:
+        for key in list({**self._flushing, **self._batches}):
+            await self.flush(key)
+
+    async def _wait_and_flush(self, key: K, batch: _Batch[T]) -> None:
+        while True:
+            deadline = min(batch.last + self.window, batch.first + self.max_wait)
+            delay = deadline - time.monotonic()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        await self._flush_batch(key, batch)
+
+    async def _flush_batch(self, key: K, batch: _Batch[T]) -> None:
+        # 同一批只处理一次：先从表中摘除，之后到达的同键条目进入新批次
+        if self._batches.get(key) is not batch:
+            return
+        del self._batches[key]
+        self._flushing.setdefault(key, []).append(batch)
+        try:
+            await self._flush(key, batch.items)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"批量处理 {key} 异常: {e}")
+        finally:
+            flushing = self._flushing[key]
+            flushing.remove(batch)
+            if not flushing:
+                del self._flushing[key]
+            batch.done.set()
@@ -0,0 +1,141 @@
+import time
+from typing import Any, Dict, List, Optional
+
+from ..logger import logger
+from ..telegram_client import TelegramClient
+from ..utils import pick_username
+from .dispatcher import MESSAGE_FIELDS, PRIORITY_LOW, PRIORITY_NORMAL, UpdateDispatcher
+from .update_tracker import UpdateTracker
+
+# update 上的内部标记：值为 True 时消息处理器不下载媒体，以占位文本代替
+STALE_MARK = "_stale"
+CATCHUP_BATCH = 100
+SUMMARY_MAX_LINES = 20
+SUMMARY_LINE_LIMIT = 200
+
+MEDIA_PLACEHOLDERS = (
+    ("photo", "[图片]"),
+    ("sticker", "[贴纸]"),
+    ("animation", "[动图]"),
+    ("voice", "[语音]"),
+    ("document", "[文件]"),
+)
+
+
+def update_message(update: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    for field in MESSAGE_FIELDS:
+        msg = update.get(field)
+        if msg:
+            return msg
+    return None
+
+
+def message_age(msg: Dict[str, Any], now: float) -> float:
+    return now - (msg.get("edit_date") or msg.get("date") or now)
+
+
+def _brief(msg: Dict[str, Any]) -> str:
+    text = msg.get("text") or msg.get("caption") or ""
+    for field, placeholder in MEDIA_PLACEHOLDERS:
+        if msg.get(field):
+            text = f"{placeholder}{text}"
+            break
+    if len(text) > SUMMARY_LINE_LIMIT:
+        text = text[:SUMMARY_LINE_LIMIT] + "…"
+    return text
+
+
+def build_summary(updates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """将同一会话的多条过期 update 合并为一条文本消息，沿用最后一条的 update_id 与会话/发送者信息"""
+    last = updates[-1]
+    field = next(f for f in MESSAGE_FIELDS if last.get(f))
+    lines: List[str] = []
+    for upd in updates[-SUMMARY_MAX_LINES:]:
+        msg = update_message(upd) or {}
+        sender = msg.get("from") or {}
+        name = pick_username(sender.get("first_name"), sender.get("last_name"), sender.get("username"))
+        lines.append(f"{name}: {_brief(msg)}")
+    head = f"[离线期间的 {len(updates)} 条消息"
+    head += f"，仅保留最近 {SUMMARY_MAX_LINES} 条]" if len(updates) > SUMMARY_MAX_LINES else "]"
+    src = last[field]
+    msg = {
+        "message_id": src.get("message_id"),
+        "date": src.get("date"),
+        "chat": src.get("chat"),
+        "from": src.get("from"),
+        "text": "\n".join([head, *lines]),
+    }
+    return {"update_id": last["update_id"], field: msg, STALE_MARK: True}
+
+
+class BacklogCatchUp:
+    """启动时以 limit=100、timeout=0 批量拉取离线期间积压的 update，按过期策略处理后再进入常规轮询。
+
+    过期 update 以低优先级投递，积压处理期间到达的实时 update 优先处理。
+    """
+
+    def __init__(
+        self,
+        tg: TelegramClient,
+        dispatcher: UpdateDispatcher,
+        tracker: UpdateTracker,
+        *,
+        horizon: float,
+        policy: str,
+        allowed_updates: Optional[List[str]] = None,
+    ) -> None:
+        self.tg = tg
+        self.dispatcher = dispatcher
+        self.tracker = tracker
+        self.horizon = horizon
+        self.policy = policy
+        self.allowed_updates = allowed_updates
+        self._summaries: Dict[Any, List[Dict[str, Any]]] = {}
+        self.counts = {"fresh": 0, "stale": 0, "dropped": 0, "summarized": 0}
+
+    async def run(self) -> None:
+        started = time.monotonic()
+        while True:
+            resp = await self.tg.get_updates(
+                offset=self.tracker.next_offset, timeout=0, allowed_updates=self.allowed_updates, limit=CATCHUP_BATCH
+            )
+            if not resp.get("ok"):
+                # 例如 webhook 仍处于设置状态（409），此时交由常规流程处理
+                logger.warning(f"拉取积压 update 失败，跳过追赶: {resp.get('description')}")
+                break
+            batch = resp.get("result") or []
+            now = time.time()
+            for upd in batch:
+                if self.tracker.accept(upd):
+                    await self._route(upd, now)
+            if len(batch) < CATCHUP_BATCH:
+                break
+        await self._flush_summaries()
+        if any(self.counts.values()):
+            logger.info(f"积压 update 追赶完成，用时 {time.monotonic() - started:.1f}s: {self.counts}")
+
+    async def _route(self, upd: Dict[str, Any], now: float) -> None:
+        msg = update_message(upd)
+        if msg is None or message_age(msg, now) <= self.horizon:
+            self.counts["fresh"] += 1
+            await self.dispatcher.submit(upd, priority=PRIORITY_NORMAL)
+            return
+        self.counts["stale"] += 1
+        if self.policy == "drop":
+            self.counts["dropped"] += 1
+            self.tracker.done(upd)
+        elif self.policy == "summarize":
+            self._summaries.setdefault((msg.get("chat") or {}).get("id"), []).append(upd)
+        else:
+            if self.policy == "skip_media":
+                upd[STALE_MARK] = True
+            await self.dispatcher.submit(upd, priority=PRIORITY_LOW)
+
+    async def _flush_summaries(self) -> None:
+        for updates in self._summaries.values():
+            # 摘要沿用最后一条的 update_id，其处理完成即代表整组完成
+            for upd in updates[:-1]:
+                self.tracker.done(upd)
+            self.counts["summarized"] += len(updates)
+            await self.dispatcher.submit(build_summary(updates), priority=PRIORITY_LOW)
+        self._summaries.clear()
@@ -0,0 +1,142 @@
+import asyncio
+import itertools
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from ..logger import logger
+
+
+MESSAGE_FIELDS = ("message", "edited_message", "channel_post", "edited_channel_post")
+
+
+def update_chat_key(update: Dict[str, Any]) -> Hashable:
+    """取出 update 所属的会话 id，作为串行处理的分组键；无法识别时归入同一组"""
+    for field in MESSAGE_FIELDS:
+        msg = update.get(field)
+        if msg:
+            chat_id = (msg.get("chat") or {}).get("id")
+            if chat_id is not None:
+                return chat_id
+    return None
+
+
+# handle 返回 DEFERRED 表示 update 已转交他处（如相册聚合、编辑去抖）稍后处理，完成时由接收方自行回调 on_done
+DEFERRED = object()
+
+PRIORITY_NORMAL = 0
+# 补齐离线积压时的过期 update：只在没有实时 update 可处理时才轮到
+PRIORITY_LOW = 1
+
+
+class UpdateDispatcher:
+    """按会话分组派发 update：同一会话内严格按到达顺序处理，不同会话由有限个 worker 并行处理"""
+
+    def __init__(
+        self,
+        handle: Callable[[Dict[str, Any]], Awaitable[Any]],
+        *,
+        workers: int = 8,
+        max_pending: int = 1000,
+        max_pending_per_chat: int = 100,
+        on_done: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> None:
+        self._handle = handle
+        # 每条 update 处理结束（无论成功与否）后回调，用于提交处理进度；被取消的不回调
+        self._on_done = on_done
+        self._worker_count = max(1, workers)
+        self._max_pending = max(1, max_pending)
+        self._max_pending_per_chat = max(1, max_pending_per_chat)
+        # 会话 -> 待处理队列；键存在即表示该会话已在就绪队列中或正被某个 worker 持有
+        self._queues: Dict[Hashable, Deque[Tuple[int, Dict[str, Any]]]] = {}
+        # 就绪会话按其队首 update 的优先级排序，同优先级内按入队顺序
+        self._ready: asyncio.PriorityQueue[Tuple[int, int, Hashable]] = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._pending = 0
+        # 待处理 update 超过单会话上限的次数
+        self.hot_chats = 0
+        self._cond = asyncio.Condition()
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def active_chats(self) -> int:
+        return len(self._queues)
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        for i in range(self._worker_count):
+            self._workers.append(asyncio.create_task(self._worker_loop(), name=f"tg-dispatch-{i}"))
+
+    async def submit(self, update: Dict[str, Any], *, priority: int = PRIORITY_NORMAL) -> None:
+        """投递 update；总队列已满时等待，向轮询侧施加背压。
+        单个会话超出上限时只告警、不丢弃也不单独等待，超出部分同样计入总上限"""
+        key = update_chat_key(update)
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._pending < self._max_pending)
+            queue = self._queues.get(key)
+            if queue is None:
+                self._queues[key] = deque([(priority, update)])
+                self._ready.put_nowait((priority, next(self._seq), key))
+            else:
+                queue.append((priority, update))
+            self._pending += 1
+        if queue is not None and len(queue) == self._max_pending_per_chat + 1:
+            self.hot_chats += 1
+            logger.warning(
+                f"会话 {key} 待处理 update 超过 {self._max_pending_per_chat} 条，"
+                f"当前总待处理 {self._pending} / {self._max_pending}"
+            )
+
+    async def join(self, timeout: float | None = None) -> bool:
+        """等待已投递的 update 全部处理完成，超时返回 False"""
+        try:
+            async with self._cond:
+                await asyncio.wait_for(self._cond.wait_for(lambda: self._pending == 0), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def stop(self, drain_timeout: float = 0) -> None:
+        if drain_timeout > 0 and self._pending:
+            if not await self.join(drain_timeout):
+                logger.warning(f"派发队列未在 {drain_timeout}s 内处理完，剩余 {self._pending} 条")
+        for t in self._workers:
+            t.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    async def _worker_loop(self) -> None:
+        while True:
+            _, _, key = await self._ready.get()
+            queue = self._queues[key]
+            _, update = queue.popleft()
+            deferred = False
+            try:
+                deferred = await self._handle(update) is DEFERRED
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"处理 update 异常: {e}")
+            finally:
+                async with self._cond:
+                    self._pending -= 1
+                    if queue:
+                        # 处理完一条后让出，避免单个高频会话长期占用 worker
+                        self._ready.put_nowait((queue[0][0], next(self._seq), key))
+                    else:
+                        del self._queues[key]
+                    self._cond.notify_all()
+            if not deferred:
+                self._notify_done(update)
+
+    def _notify_done(self, update: Dict[str, Any]) -> None:
+        if self._on_done is None:
+            return
+        try:
+            self._on_done(update)
+        except Exception as e:
+            logger.error(f"update 完成回调异常: {e}")
@@ -0,0 +1,72 @@
+import random
+import time
+from typing import Dict, Hashable
+
+from ..config import global_config
+from ..config.official_configs import GroupLoadSheddingConfig, LoadSheddingConfig
+from ..rate_limit import TokenBucket
+
+ADMIT = "admit"
+ADMIT_SKIP_MEDIA = "skip_media"
+DROP = "drop"
+
+
+class _GroupState:
+    __slots__ = ("bucket", "sample_ratio", "over_budget_sample_ratio", "admitted", "media_skipped", "dropped")
+
+    def __init__(self, max_messages: int, window: float, sample_ratio: float, over_budget_sample_ratio: float) -> None:
+        self.bucket = TokenBucket(max_messages / max(window, 1e-3), max_messages) if max_messages > 0 else None
+        self.sample_ratio = sample_ratio
+        self.over_budget_sample_ratio = over_budget_sample_ratio
+        self.admitted = 0
+        self.media_skipped = 0
+        self.dropped = 0
+
+
+class LoadShedder:
+    """按群组的入站预算：预算内的普通消息按 sample_ratio 抽样，超出预算后按 over_budget_sample_ratio 抽样且不下载媒体。
+    @ 或回复 bot 的消息始终完整处理（仍计入预算）。"""
+
+    def __init__(self, cfg: LoadSheddingConfig) -> None:
+        self.cfg = cfg
+        self.enabled = cfg.enabled
+        self._overrides: Dict[int, GroupLoadSheddingConfig] = {g.chat_id: g for g in cfg.groups}
+        self._groups: Dict[Hashable, _GroupState] = {}
+
+    def admit(self, chat_id: Hashable, addressed: bool) -> str:
+        state = self._groups.get(chat_id)
+        if state is None:
+            state = self._groups[chat_id] = self._new_state(chat_id)
+        within_budget = state.bucket is None or state.bucket.try_acquire(time.monotonic())
+        if addressed:
+            state.admitted += 1
+            return ADMIT
+        ratio = state.sample_ratio if within_budget else state.over_budget_sample_ratio
+        if ratio < 1.0 and random.random() >= ratio:
+            state.dropped += 1
+            return DROP
+        if within_budget:
+            state.admitted += 1
+            return ADMIT
+        state.media_skipped += 1
+        return ADMIT_SKIP_MEDIA
+
+    def stats(self) -> Dict[Hashable, Dict[str, int]]:
+        return {
+            chat_id: {"admitted": s.admitted, "media_skipped": s.media_skipped, "dropped": s.dropped}
+            for chat_id, s in self._groups.items()
+            if s.media_skipped or s.dropped
+        }
+
+    def _new_state(self, chat_id: Hashable) -> _GroupState:
+        cfg = self.cfg
+        override = self._overrides.get(chat_id)  # type: ignore[arg-type]
+
+        def pick(name: str):
+            value = getattr(override, name, None) if override is not None else None
+            return getattr(cfg, name) if value is None else value
+
+        return _GroupState(pick("max_messages"), pick("window"), pick("sample_ratio"), pick("over_budget_sample_ratio"))
+
+
+load_shedder = LoadShedder(global_config.load_shedding)
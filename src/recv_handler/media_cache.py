@@ -0,0 +1,159 @@
+import asyncio
+import os
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from ..logger import logger
+from ..config import global_config
+
+_SAFE_KEY = re.compile(r"[^A-Za-z0-9_-]")
+
+
+class MediaCache:
+    """按 Telegram file_unique_id 缓存入站媒体的 base64 内容：内存 LRU（按字节预算）+ 可选磁盘层（按总大小淘汰）"""
+
+    def __init__(
+        self,
+        *,
+        memory_max_bytes: int = 0,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = 0,
+    ) -> None:
+        self.memory_max_bytes = max(0, memory_max_bytes)
+        self.disk_max_bytes = max(0, disk_max_bytes)
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_dir: Optional[Path] = Path(disk_dir) if disk_dir and self.disk_max_bytes > 0 else None
+        # 磁盘层索引：key -> 文件大小，按最近使用排序
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.evictions = 0
+        if self._disk_dir is not None:
+            self._load_disk_index()
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory_max_bytes > 0 or self._disk_dir is not None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+        }
+
+    async def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        key = _SAFE_KEY.sub("_", key)
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self.hits_memory += 1
+            return data
+        if self._disk_dir is not None and key in self._disk:
+            try:
+                data = await asyncio.to_thread(self._read_disk, key)
+            except Exception as e:
+                logger.debug(f"读取磁盘媒体缓存失败 {key}: {e}")
+                self._drop_disk_entry(key)
+            else:
+                self._disk.move_to_end(key)
+                self.hits_disk += 1
+                self._put_memory(key, data)
+                return data
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, data: str) -> None:
+        if not self.enabled or not key:
+            return
+        key = _SAFE_KEY.sub("_", key)
+        self._put_memory(key, data)
+        if self._disk_dir is not None and key not in self._disk and len(data) <= self.disk_max_bytes:
+            try:
+                await asyncio.to_thread(self._write_disk, key, data)
+            except Exception as e:
+                logger.debug(f"写入磁盘媒体缓存失败 {key}: {e}")
+                return
+            if key in self._disk:
+                return
+            self._disk[key] = len(data)
+            self._disk_bytes += len(data)
+            while self._disk_bytes > self.disk_max_bytes and self._disk:
+                old_key = next(iter(self._disk))
+                self._drop_disk_entry(old_key)
+                self.evictions += 1
+
+    def _put_memory(self, key: str, data: str) -> None:
+        size = len(data)
+        if size > self.memory_max_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = data
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_max_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.evictions += 1
+
+    def _path(self, key: str) -> Path:
+        assert self._disk_dir is not None
+        return self._disk_dir / f"{key}.b64"
+
+    def _load_disk_index(self) -> None:
+        assert self._disk_dir is not None
+        self._disk_dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for p in self._disk_dir.glob("*.b64"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, p.stem, st.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    def _read_disk(self, key: str) -> str:
+        path = self._path(key)
+        data = path.read_text(encoding="ascii")
+        # 刷新 mtime，使重启后重建的索引仍保持最近使用顺序
+        os.utime(path)
+        return data
+
+    def _write_disk(self, key: str, data: str) -> None:
+        path = self._path(key)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(data, encoding="ascii")
+        os.replace(tmp, path)
+
+    def _drop_disk_entry(self, key: str) -> None:
+        size = self._disk.pop(key, None)
+        if size is None:
+            return
+        self._disk_bytes -= size
+        try:
+            self._path(key).unlink(missing_ok=True)
+        except OSError as e:
+            logger.debug(f"删除磁盘媒体缓存失败 {key}: {e}")
+
+
+_cfg = global_config.media_cache
+media_cache = MediaCache(
+    memory_max_bytes=_cfg.memory_max_bytes if _cfg.enabled else 0,
+    disk_dir=_cfg.disk_dir if _cfg.enabled and _cfg.disk_enabled else None,
+    disk_max_bytes=_cfg.disk_max_bytes,
+)
@@ -0,0 +1,59 @@
+import re
+from typing import Any, Dict, List, Optional
+
+
+class MentionMatcher:
+    """判断消息是否 @ 或回复了 bot；在获取到 bot 身份时构建一次，逐条消息只做查找与比较"""
+
+    __slots__ = ("bot_id", "handle", "_pattern")
+
+    def __init__(self, bot_id: int, username: Optional[str]) -> None:
+        self.bot_id = bot_id
+        self.handle = f"@{username.lower()}" if username else None
+        self._pattern = re.compile(rf"@{re.escape(username)}\b", re.IGNORECASE) if username else None
+
+    def match(self, msg: Dict[str, Any]) -> Optional[str]:
+        """命中时返回命中方式（供调试日志使用），未命中返回 None"""
+        # 被回复到 bot
+        reply_to = msg.get("reply_to_message")
+        if reply_to and (reply_to.get("from") or {}).get("id") == self.bot_id:
+            return "reply_to_message.from.id == bot_id"
+        # @mention in text entities / caption entities
+        text = msg.get("text") or ""
+        hit = self._scan_entities(text, msg.get("entities"))
+        if hit:
+            return f"entities 中的 {hit}"
+        caption = msg.get("caption") or ""
+        hit = self._scan_entities(caption, msg.get("caption_entities"))
+        if hit:
+            return f"caption_entities 中的 {hit}"
+        # 实体缺失时兜底纯文本（避免客户端异常导致的偏移问题）
+        if self._pattern is not None:
+            for s in (text, caption):
+                if "@" in s and self._pattern.search(s):
+                    return "文本兜底 @username 匹配"
+        return None
+
+    def _scan_entities(self, base_text: str, entities: Optional[List[Dict[str, Any]]]) -> Optional[str]:
+        if not entities:
+            return None
+        handle = self.handle
+        for ent in entities:
+            etype = ent.get("type")
+            if etype == "mention":
+                # 长度不同的 @ 不可能是 bot，免去切片与大小写转换
+                if handle and ent.get("length") == len(handle):
+                    offset = ent.get("offset", 0)
+                    if base_text[offset : offset + len(handle)].lower() == handle:
+                        return "mention"
+            elif etype == "bot_command":
+                # 处理 /cmd@username 形式
+                if handle:
+                    offset = ent.get("offset", 0)
+                    token = base_text[offset : offset + ent.get("length", 0)]
+                    if "@" in token and handle in token.lower():
+                        return "bot_command"
+            elif etype == "text_mention":
+                if (ent.get("user") or {}).get("id") == self.bot_id:
+                    return "text_mention"
+        return None
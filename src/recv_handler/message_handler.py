@@ -1,6 +1,6 @@
+import asyncio
 import time
-import re
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
 
 from maim_message import (
     UserInfo,
@@ -11,11 +11,18 @@ from maim_message import (
     FormatInfo,
 )
 
-from ..logger import logger
+from ..logger import logger, sampled
 from ..config import global_config
-from ..utils import to_base64, is_group_chat, pick_username
-from ..telegram_client import TelegramClient
-from .message_sending import message_send_instance
+from ..utils import is_group_chat, pick_username
+from ..telegram_client import TelegramClient, TelegramFileTooLarge
+from .priority_scheduler import LANE_AMBIENT, LANE_MENTION, LANE_PRIVATE, priority_scheduler
+from .media_cache import media_cache
+from .catchup import STALE_MARK
+from .batching import KeyedBatcher
+from .dispatcher import DEFERRED
+from .load_shedding import ADMIT_SKIP_MEDIA, DROP, load_shedder
+from .access_control import access_control
+from .mention import MentionMatcher
 
 
 ACCEPT_FORMAT = [
@@ -27,43 +34,112 @@ ACCEPT_FORMAT = [
     "imageurl",
 ]
 
+# Telegram 相册最多 10 条
+ALBUM_MAX_ITEMS = 10
+
 
 class TelegramUpdateHandler:
     def __init__(self, tg_client: TelegramClient) -> None:
         self.tg = tg_client
         self.bot_id: Optional[int] = None
         self.bot_username: Optional[str] = None
+        self.mention: Optional[MentionMatcher] = None
+        # 聚合后处理完的 update 逐条回调（提交处理进度）；聚合期间崩溃的 update 重启后重放
+        self.on_done: Optional[Callable[[Dict[str, Any]], None]] = None
+        # 相册的各条消息分别以独立 update 到达，按 (chat_id, media_group_id) 聚合后作为一条消息发送
+        tg_cfg = global_config.telegram_bot
+        self.albums: Optional[KeyedBatcher[Tuple[Any, str], Dict[str, Any]]] = None
+        if tg_cfg.album_aggregation:
+            self.albums = KeyedBatcher(
+                self._flush_album,
+                window=tg_cfg.album_window,
+                max_wait=tg_cfg.album_max_wait,
+                max_items=ALBUM_MAX_ITEMS,
+            )
+        # 连续编辑同一条消息时只转发最后一个版本
+        self.edits: Optional[KeyedBatcher[Tuple[Any, Any], Dict[str, Any]]] = None
+        if tg_cfg.edit_debounce > 0:
+            self.edits = KeyedBatcher(self._flush_edit, window=tg_cfg.edit_debounce, max_wait=tg_cfg.edit_max_wait)
+
+    async def close(self) -> None:
+        """处理尚在聚合中的相册与编辑"""
+        if self.albums is not None:
+            await self.albums.close()
+        if self.edits is not None:
+            await self.edits.close()
 
     def set_self(self, bot_id: int, username: Optional[str]) -> None:
         self.bot_id = bot_id
         self.bot_username = username
+        self.mention = MentionMatcher(bot_id, username)
 
     async def check_allow_to_chat(self, user_id: int, chat_id: Optional[int], chat_type: str) -> bool:
-        if is_group_chat(chat_type):
-            if global_config.chat.group_list_type == "whitelist" and chat_id not in global_config.chat.group_list:
-                logger.warning("群聊不在聊天白名单中，消息被丢弃")
-                return False
-            if global_config.chat.group_list_type == "blacklist" and chat_id in global_config.chat.group_list:
-                logger.warning("群聊在聊天黑名单中，消息被丢弃")
-                return False
-        else:
-            if global_config.chat.private_list_type == "whitelist" and user_id not in global_config.chat.private_list:
-                logger.warning("私聊不在聊天白名单中，消息被丢弃")
-                return False
-            if global_config.chat.private_list_type == "blacklist" and user_id in global_config.chat.private_list:
-                logger.warning("私聊在聊天黑名单中，消息被丢弃")
-                return False
-        if user_id in global_config.chat.ban_user_id:
-            logger.warning("用户在全局黑名单中，消息被丢弃")
-            return False
-        return True
+        # 被丢弃的消息按原因计数，不逐条输出日志
+        return access_control.allow(user_id, chat_id, is_group_chat(chat_type))
 
-    async def handle_update(self, update: Dict[str, Any]) -> None:
+    async def handle_update(self, update: Dict[str, Any]) -> Any:
+        """进入相册聚合或编辑去抖的 update 返回 DEFERRED，由聚合批次处理完后回调 on_done"""
         msg = update.get("message") or update.get("edited_message")
         if not msg:
             return
 
+        edited = update.get("edited_message")
+        if edited:
+            max_age = global_config.telegram_bot.edit_max_age
+            if max_age > 0 and time.time() - edited.get("date", 0) > max_age:
+                logger.debug(f"忽略对 {max_age}s 前消息的编辑: message_id={edited.get('message_id')}")
+                return
+            if self.edits is not None:
+                self.edits.add((edited.get("chat", {}).get("id"), edited.get("message_id")), update)
+                return DEFERRED
+
+        if self.albums is not None:
+            chat_id = msg.get("chat", {}).get("id")
+            album_id = msg.get("media_group_id")
+            if album_id:
+                self.albums.add((chat_id, album_id), update)
+                return DEFERRED
+            # 同一会话中相册之后的消息须排在相册之后发送
+            if self.albums:
+                await self.albums.flush_matching(lambda key: key[0] == chat_id)
+        await self._process([update])
+
+    async def _flush_album(self, key: Tuple[Hashable, str], updates: List[Dict[str, Any]]) -> None:
+        updates.sort(key=lambda u: (u.get("message") or u.get("edited_message") or {}).get("message_id", 0))
+        await self._process_deferred(updates, updates)
+
+    async def _flush_edit(self, key: Tuple[Hashable, Any], updates: List[Dict[str, Any]]) -> None:
+        latest = max(updates, key=lambda u: u["edited_message"].get("edit_date", 0))
+        if len(updates) > 1:
+            logger.debug(f"合并对同一消息的 {len(updates)} 次编辑: message_id={key[1]}")
+        # 被合并掉的旧版本随最新版本一起视为已处理
+        await self._process_deferred([latest], updates)
+
+    async def _process_deferred(self, batch: List[Dict[str, Any]], updates: List[Dict[str, Any]]) -> None:
+        """处理聚合后的批次；与派发器一致，无论成功与否都提交处理进度，被取消时不提交"""
+        try:
+            await self._process(batch)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"处理聚合的 update 异常: {e}")
+        self._notify_done(updates)
+
+    def _notify_done(self, updates: List[Dict[str, Any]]) -> None:
+        if self.on_done is None:
+            return
+        for update in updates:
+            try:
+                self.on_done(update)
+            except Exception as e:
+                logger.error(f"update 完成回调异常: {e}")
+
+    async def _process(self, updates: List[Dict[str, Any]]) -> None:
+        """updates 多于一条时为同一相册的各部分，合并为一条消息"""
+        update = updates[0]
+        msg = update.get("message") or update.get("edited_message")
         message_time = time.time()
+        started = time.perf_counter()
         chat = msg.get("chat", {})
         from_user = msg.get("from", {})
         chat_type = chat.get("type")
@@ -73,6 +149,17 @@ class TelegramUpdateHandler:
         if not await self.check_allow_to_chat(user_id, chat_id, chat_type):
             return
 
+        album = [u.get("message") or u.get("edited_message") for u in updates] if msg.get("media_group_id") else None
+        skip_media = bool(update.get(STALE_MARK))
+        addressed: Optional[bool] = None
+        # 高频群组限流：在构建消息与下载媒体之前决定是否处理
+        if load_shedder.enabled and is_group_chat(chat_type):
+            addressed = any(self._is_mentioning_self(part) for part in album or [msg])
+            verdict = load_shedder.admit(chat_id, addressed)
+            if verdict == DROP:
+                return
+            skip_media = skip_media or verdict == ADMIT_SKIP_MEDIA
+
         # Build user_info / group_info
         user_info = UserInfo(
             platform=global_config.maibot_server.platform_name,
@@ -95,7 +182,9 @@ class TelegramUpdateHandler:
             accept_format=ACCEPT_FORMAT,
         )
 
-        seg_list, additional_config = await self._extract_segments(msg)
+        seg_list, additional_config = await self._extract_segments(
+            msg, skip_media=skip_media, album=album, addressed=addressed
+        )
         if not seg_list:
             logger.warning("处理后消息内容为空")
             return
@@ -112,10 +201,37 @@ class TelegramUpdateHandler:
             additional_config=additional_config,
         )
         message_base = MessageBase(message_info=message_info, message_segment=submit_seg, raw_message=None)
-        logger.info("发送到MaiBot处理信息")
-        await message_send_instance.message_send(message_base)
+        if not is_group_chat(chat_type):
+            lane = LANE_PRIVATE
+        elif additional_config.get("at_bot"):
+            lane = LANE_MENTION
+        else:
+            lane = LANE_AMBIENT
+        # 每条 update 一行汇总；production 下按 sample_every 抽样
+        if sampled("update"):
+            logger.info(
+                "发送到MaiBot处理信息 | chat={} user={} msg={} segs={} lane={} media={} cost={:.0f}ms",
+                chat_id,
+                user_id,
+                msg.get("message_id"),
+                len(seg_list),
+                lane,
+                "skip" if skip_media else "full",
+                (time.perf_counter() - started) * 1000,
+            )
+        await priority_scheduler.submit(lane, message_base)
 
-    async def _extract_segments(self, msg: Dict[str, Any]) -> Tuple[List[Seg] | None, Dict[str, Any]]:
+    async def _extract_segments(
+        self,
+        msg: Dict[str, Any],
+        skip_media: bool = False,
+        album: Optional[List[Dict[str, Any]]] = None,
+        addressed: Optional[bool] = None,
+    ) -> Tuple[List[Seg] | None, Dict[str, Any]]:
+        """skip_media 为 True 时（离线积压的过期消息）不下载媒体，直接以占位文本代替；
+        album 为同一相册的全部消息时，取其说明文字并并发下载全部媒体；
+        addressed 为调用方已算出的 @/回复 bot 判定结果，None 时在此计算"""
+        parts = album or [msg]
         segs: List[Seg] = []
         additional: Dict[str, Any] = {}
 
@@ -138,146 +254,126 @@ class TelegramUpdateHandler:
         # 文本
         if msg.get("text"):
             segs.append(Seg(type="text", data=msg["text"]))
+        if album:
+            captions = [p["caption"] for p in album if p.get("caption")]
+            if captions:
+                segs.append(Seg(type="text", data="\n".join(captions)))
 
-        # 图片
-        photos = msg.get("photo") or []
-        if photos:
-            # Telegram 返回不同尺寸，取最大
-            largest = max(photos, key=lambda p: p.get("file_size", 0))
-            file_id = largest.get("file_id")
-            if file_id:
-                file_path = await self.tg.get_file_path(file_id)
-                if file_path:
-                    try:
-                        file_bytes = await self.tg.download_file_bytes(file_path)
-                        segs.append(Seg(type="image", data=to_base64(file_bytes)))
-                    except Exception as e:
-                        logger.error(f"下载图片失败: {e}")
-                        # 降级为占位
-                        segs.append(Seg(type="text", data="[图片]"))
-
-        # 贴纸（sticker）
-        sticker = msg.get("sticker")
-        if sticker:
-            try:
+        # 媒体：下载并发进行，结果仍按 图片、贴纸、动图、语音 的固定顺序放回；下载失败或超限时降级为占位
+        media_parts: List[List[Seg] | Awaitable[List[Seg]]] = []
+
+        def media_part(
+            media: Dict[str, Any], seg_type: str, error_desc: str, placeholder: str, cacheable: bool = True
+        ) -> List[Seg] | Awaitable[List[Seg]]:
+            if skip_media:
+                return [Seg(type="text", data=placeholder)]
+            return self._fetch_media_seg(media, seg_type, error_desc, placeholder=placeholder, cacheable=cacheable)
+
+        for part in parts:
+            # 图片
+            photos = part.get("photo") or []
+            if photos:
+                # Telegram 返回不同尺寸，取最大
+                largest = max(photos, key=lambda p: p.get("file_size", 0))
+                media_parts.append(media_part(largest, "image", "下载图片失败", "[图片]"))
+
+            # 贴纸（sticker）
+            sticker = part.get("sticker")
+            if sticker:
                 if not (sticker.get("is_animated") or sticker.get("is_video")):
-                    file_id = sticker.get("file_id")
-                    if file_id:
-                        fp = await self.tg.get_file_path(file_id)
-                        if fp:
-                            data = await self.tg.download_file_bytes(fp)
-                            segs.append(Seg(type="emoji", data=to_base64(data)))
+                    media_parts.append(media_part(sticker, "emoji", "贴纸处理失败", "[贴纸]"))
                 else:
-                    segs.append(Seg(type="text", data="[贴纸]"))
-            except Exception as e:
-                logger.error(f"贴纸处理失败: {e}")
+                    media_parts.append([Seg(type="text", data="[贴纸]")])
 
-        # 动图（animation）
-        animation = msg.get("animation")
-        if animation:
-            try:
-                file_id = animation.get("file_id")
-                if file_id:
-                    fp = await self.tg.get_file_path(file_id)
-                    if fp:
-                        data = await self.tg.download_file_bytes(fp)
-                        segs.append(Seg(type="emoji", data=to_base64(data)))
-            except Exception as e:
-                logger.error(f"动图处理失败: {e}")
+            # 动图（animation）
+            animation = part.get("animation")
+            if animation:
+                media_parts.append(media_part(animation, "emoji", "动图处理失败", "[动图]"))
 
-        # 语音（voice）
-        voice = msg.get("voice")
-        if voice:
-            try:
-                file_id = voice.get("file_id")
-                if file_id:
-                    fp = await self.tg.get_file_path(file_id)
-                    if fp:
-                        data = await self.tg.download_file_bytes(fp)
-                        segs.append(Seg(type="voice", data=to_base64(data)))
-            except Exception as e:
-                logger.error(f"语音处理失败: {e}")
+            # 语音（voice）
+            voice = part.get("voice")
+            if voice:
+                # 语音几乎不会重复出现，不进入缓存
+                media_parts.append(media_part(voice, "voice", "语音处理失败", "[语音]", cacheable=False))
+
+        fetched = iter(await asyncio.gather(*[p for p in media_parts if not isinstance(p, list)]))
+        for media_segs in media_parts:
+            segs.extend(media_segs if isinstance(media_segs, list) else next(fetched))
 
         # 文档（document）
-        document = msg.get("document")
-        if document:
-            file_name = document.get("file_name") or "文件"
-            segs.append(Seg(type="text", data=f"[文件:{file_name}]"))
+        for part in parts:
+            document = part.get("document")
+            if document:
+                file_name = document.get("file_name") or "文件"
+                segs.append(Seg(type="text", data=f"[文件:{file_name}]"))
 
         # 在群聊中识别 @bot 或回复 bot 的消息，插入 mention_bot 段，便于核心识别
-        try:
-            if self._is_mentioning_self(msg):
-                # 标记被@
-                segs.insert(0, Seg(type="mention_bot", data="1"))
-                additional["at_bot"] = True
-        except Exception:
-            pass
+        if addressed is None:
+            addressed = any(self._is_mentioning_self(part) for part in parts)
+        if addressed:
+            # 标记被@
+            segs.insert(0, Seg(type="mention_bot", data="1"))
+            additional["at_bot"] = True
 
         return segs or None, additional
 
+    async def _fetch_media_seg(
+        self,
+        media: Dict[str, Any],
+        seg_type: str,
+        error_desc: str,
+        *,
+        placeholder: Optional[str] = None,
+        cacheable: bool = True,
+    ) -> List[Seg]:
+        try:
+            data = await self._fetch_media_base64(media, cacheable)
+        except TelegramFileTooLarge as e:
+            logger.warning(f"{error_desc}: {e}")
+            return [Seg(type="text", data=placeholder)] if placeholder else []
+        except Exception as e:
+            logger.error(f"{error_desc}: {e}")
+            return [Seg(type="text", data=placeholder)] if placeholder else []
+        return [Seg(type=seg_type, data=data)] if data else []
+
+    async def _fetch_media_base64(self, media: Dict[str, Any], cacheable: bool = True) -> Optional[str]:
+        """下载媒体并返回 base64；可缓存的媒体按 file_unique_id 命中缓存时不再请求 Telegram"""
+        file_id = media.get("file_id")
+        if not file_id:
+            return None
+        unique_id = media.get("file_unique_id") if cacheable else None
+        if unique_id:
+            cached = await media_cache.get(unique_id)
+            if cached is not None:
+                return cached
+        # 消息中已给出大小时先行校验，超限则连 getFile 也不必请求
+        self.tg.check_download_size(media.get("file_size"))
+        file_path = await self.tg.get_file_path(file_id)
+        if not file_path:
+            return None
+        data = await self.tg.download_file_base64(file_path, media.get("file_size"))
+        if unique_id:
+            await media_cache.put(unique_id, data)
+        return data
+
     def _is_mentioning_self(self, msg: Dict[str, Any]) -> bool:
-        if self.bot_id is None:
+        if self.mention is None:
             return False
-        # 被回复到 bot
-        reply_to = msg.get("reply_to_message")
-        if reply_to and reply_to.get("from", {}).get("id") == self.bot_id:
-            logger.debug("@识别: 命中 reply_to_message.from.id == bot_id")
-            return True
-        # @mention in text entities / caption entities
-        text = msg.get("text") or ""
-        entities = msg.get("entities") or []
-        if self._entities_have_self(text, entities):
-            logger.debug("@识别: 命中 entities 中的 mention/text_mention/bot_command")
-            return True
-        caption = msg.get("caption") or ""
-        cap_entities = msg.get("caption_entities") or []
-        if self._entities_have_self(caption, cap_entities):
-            logger.debug("@识别: 命中 caption_entities 中的 mention/text_mention/bot_command")
+        try:
+            hit = self.mention.match(msg)
+        except Exception:
+            return False
+        if hit:
+            logger.debug("@识别: 命中 {}", hit)
             return True
-        # 实体缺失时兜底纯文本（避免客户端异常导致的偏移问题）
-        if self.bot_username:
-            pattern = re.compile(rf"@{re.escape(self.bot_username)}\b", re.IGNORECASE)
-            if (text and pattern.search(text)) or (caption and pattern.search(caption)):
-                logger.debug("@识别: 命中文本兜底 @username 匹配")
-                return True
+        # 参数只在 DEBUG 级别实际输出时才会被格式化
         logger.debug(
-            f"@识别: 未命中 | bot_id={self.bot_id} bot_username={self.bot_username} "
-            f"text='{text}' entities={entities} caption='{caption}' cap_entities={cap_entities}"
+            "@识别: 未命中 | bot_id={} bot_username={} text={!r} entities={} caption={!r} cap_entities={}",
+            self.bot_id,
+            self.bot_username,
+            msg.get("text") or "",
+            msg.get("entities") or [],
+            msg.get("caption") or "",
+            msg.get("caption_entities") or [],
         )
         return False
-
-    def _entities_have_self(self, base_text: str, entities: List[Dict[str, Any]]) -> bool:
-        if not entities:
-            return False
-        uname_lower = (self.bot_username or "").lower()
-        for ent in entities:
-            etype = ent.get("type")
-            if etype == "mention":
-                try:
-                    offset = int(ent.get("offset", 0))
-                    length = int(ent.get("length", 0))
-                    token = base_text[offset : offset + length]
-                    if uname_lower and token.lower() == f"@{uname_lower}":
-                        logger.debug(f"@识别: mention 实体命中 token='{token}'")
-                        return True
-                except Exception:
-                    continue
-            elif etype == "bot_command":
-                # 处理 /cmd@username 形式
-                try:
-                    offset = int(ent.get("offset", 0))
-                    length = int(ent.get("length", 0))
-                    token = base_text[offset : offset + length]
-                    if uname_lower and f"@{uname_lower}" in token.lower():
-                        logger.debug(f"@识别: bot_command 实体命中 token='{token}'")
-                        return True
-                except Exception:
-                    continue
-            elif etype == "text_mention":
-                user = ent.get("user") or {}
-                if user.get("id") == self.bot_id:
-                    logger.debug("@识别: text_mention.user.id 命中 bot_id")
-                    return True
-        return False
-
-        return segs or None, additional
@@ -1,23 +1,63 @@
+from typing import Dict, Optional
+
 from maim_message import MessageBase, Router
 from ..logger import logger
+from ..config import global_config
+from .outbound_buffer import OutboundBuffer
 
 
 class MessageSending:
     """负责把消息发送到MaiBot"""
 
     maibot_router: Router = None
+    buffer: Optional[OutboundBuffer] = None
+
+    def start(self) -> None:
+        """启用发送缓冲，需在设置 maibot_router 之后调用"""
+        cfg = global_config.maibot_server
+        self.buffer = OutboundBuffer(
+            self._send_direct,
+            self._is_connected,
+            max_messages=cfg.send_buffer_size,
+            spill_path=cfg.spill_path or None,
+            retry_interval=cfg.retry_interval,
+        )
+        self.buffer.start()
+
+    async def close(self) -> None:
+        if self.buffer is not None:
+            await self.buffer.close()
+
+    def stats(self) -> Dict[str, int]:
+        return self.buffer.stats() if self.buffer is not None else {}
 
     async def message_send(self, message_base: MessageBase) -> bool:
+        """发送到 MaiBot；启用缓冲时连接异常的消息进入缓冲队列稍后重发，同样返回 True"""
+        if self.buffer is not None:
+            await self.buffer.submit(message_base)
+            return True
         try:
-            send_status = await self.maibot_router.send_message(message_base)
-            if not send_status:
-                raise RuntimeError("可能是路由未正确配置或连接异常")
-            return send_status
+            return await self._send_direct(message_base)
         except Exception as e:
             logger.error(f"发送消息失败: {str(e)}")
             logger.error("请检查与MaiBot之间的连接")
             return False
 
+    def ready(self) -> bool:
+        """MaiBot 已连接且发送缓冲中没有待重放的消息，此时发送的消息会立即送达"""
+        return self._is_connected() and (self.buffer is None or not self.buffer.backlog)
+
+    async def _send_direct(self, message_base: MessageBase) -> bool:
+        send_status = await self.maibot_router.send_message(message_base)
+        if not send_status:
+            raise RuntimeError("可能是路由未正确配置或连接异常")
+        return send_status
+
+    def _is_connected(self) -> bool:
+        return self.maibot_router is not None and self.maibot_router.check_connection(
+            global_config.maibot_server.platform_name
+        )
+
     async def send_custom_message(self, custom_message: dict, platform: str, message_type: str) -> bool:
         try:
             await self.maibot_router.send_custom_message(
@@ -0,0 +1,244 @@
+import asyncio
+import os
+from collections import deque
+from pathlib import Path
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from maim_message import MessageBase
+
+from .. import json_codec
+from ..logger import logger
+
+# 每次从溢出文件读回内存的条数
+REFILL_BATCH = 100
+
+
+class OutboundBuffer:
+    """发往 MaiBot 的消息缓冲：连接正常时直接发送，失败或断线时进入内存队列并后台按序重试；
+    内存队列满后追加写入磁盘上的溢出文件（JSONL），连接恢复后按原顺序重放。
+
+    顺序保证：溢出文件中尚有未重放的消息时，新消息一律追加到文件末尾。
+    """
+
+    def __init__(
+        self,
+        send: Callable[[MessageBase], Awaitable[bool]],
+        is_connected: Callable[[], bool],
+        *,
+        max_messages: int = 1000,
+        spill_path: Optional[str] = None,
+        retry_interval: float = 2.0,
+    ) -> None:
+        self._send = send
+        self._is_connected = is_connected
+        self.max_messages = max(1, max_messages)
+        self.retry_interval = max(0.1, retry_interval)
+        self._memory: Deque[MessageBase] = deque()
+        self._spill_path: Optional[Path] = Path(spill_path) if spill_path else None
+        self._offset_path: Optional[Path] = (
+            self._spill_path.with_suffix(self._spill_path.suffix + ".offset") if self._spill_path else None
+        )
+        # 溢出文件中已读回内存的字节偏移量，以及其后尚未读回的条数
+        self._spill_offset = 0
+        self._spill_unread = 0
+        self._io_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.sent_direct = 0
+        self.replayed = 0
+        self.spilled_total = 0
+        self.dropped = 0
+        self.send_failures = 0
+        if self._spill_path is not None:
+            self._load_spill_state()
+
+    @property
+    def backlog(self) -> int:
+        return len(self._memory) + self._spill_unread
+
+    def start(self) -> None:
+        """上次退出时留有未发送的消息则立即开始重放"""
+        if self.backlog:
+            logger.info(f"发现 {self.backlog} 条未发送到 MaiBot 的消息，连接后将按序重放")
+            self._ensure_replay()
+
+    async def submit(self, message: MessageBase) -> None:
+        if not self.backlog and self._is_connected():
+            if await self._try_send(message):
+                self.sent_direct += 1
+                return
+        if self._spill_unread or len(self._memory) >= self.max_messages:
+            await self._spill(message)
+        else:
+            self._memory.append(message)
+        self._ensure_replay()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "buffered": len(self._memory),
+            "spilled": self._spill_unread,
+            "sent_direct": self.sent_direct,
+            "replayed": self.replayed,
+            "spilled_total": self.spilled_total,
+            "dropped": self.dropped,
+            "send_failures": self.send_failures,
+        }
+
+    async def close(self) -> None:
+        """停止重放；内存中尚未发送的消息写回溢出文件头部，下次启动时继续"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._spill_path is None:
+            if self._memory:
+                self.dropped += len(self._memory)
+                logger.warning(f"未配置溢出文件，{len(self._memory)} 条未发送到 MaiBot 的消息被丢弃")
+                self._memory.clear()
+            return
+        async with self._io_lock:
+            lines = [json_codec.dumps(m.to_dict()) for m in self._memory]
+            try:
+                await asyncio.to_thread(self._persist, lines)
+                self._spill_unread += len(lines)
+                self._memory.clear()
+            except Exception as e:
+                self.dropped += len(lines)
+                logger.error(f"保存未发送到 MaiBot 的消息失败: {e}")
+
+    async def _try_send(self, message: MessageBase) -> bool:
+        try:
+            if await self._send(message):
+                return True
+        except Exception as e:
+            logger.debug(f"发送到 MaiBot 失败: {e}")
+        self.send_failures += 1
+        return False
+
+    def _ensure_replay(self) -> None:
+        if self._task is None or self._task.done():
+            if self._is_connected():
+                logger.info(f"缓冲队列中有 {self.backlog} 条待发送消息，按序重发")
+            else:
+                logger.warning("MaiBot 连接异常，消息进入缓冲队列，连接恢复后按序重发")
+            self._task = asyncio.create_task(self._replay_loop())
+
+    async def _replay_loop(self) -> None:
+        while self.backlog:
+            if not self._memory:
+                await self._refill()
+                if not self._memory:
+                    break
+            if not self._is_connected() or not await self._try_send(self._memory[0]):
+                await asyncio.sleep(self.retry_interval)
+                continue
+            self._memory.popleft()
+            self.replayed += 1
+        logger.info(f"缓冲队列已清空，恢复直接发送: {self.stats()}")
+
+    async def _spill(self, message: MessageBase) -> None:
+        if self._spill_path is None:
+            self.dropped += 1
+            logger.error("发往 MaiBot 的缓冲队列已满且未配置溢出文件，消息被丢弃")
+            return
+        line = json_codec.dumps(message.to_dict())
+        async with self._io_lock:
+            try:
+                await asyncio.to_thread(self._append, line)
+            except Exception as e:
+                self.dropped += 1
+                logger.error(f"写入溢出文件失败，消息被丢弃: {e}")
+                return
+            if not self._spill_unread:
+                logger.warning(f"发往 MaiBot 的缓冲队列已满，后续消息写入 {self._spill_path}")
+            self._spill_unread += 1
+            self.spilled_total += 1
+
+    async def _refill(self) -> None:
+        async with self._io_lock:
+            if not self._spill_unread:
+                return
+            lines, self._spill_offset = await asyncio.to_thread(self._read_lines, self._spill_offset, REFILL_BATCH)
+            # 先放入内存再扣减未读计数，中间不让出事件循环，避免新消息越过这批消息直接发送
+            for line in lines:
+                try:
+                    self._memory.append(MessageBase.from_dict(json_codec.loads(line)))
+                except Exception as e:
+                    self.dropped += 1
+                    logger.warning(f"溢出文件中的消息无法解析，已跳过: {e}")
+            self._spill_unread = max(0, self._spill_unread - len(lines)) if lines else 0
+            if self._spill_unread:
+                await asyncio.to_thread(self._write_offset, self._spill_offset)
+            else:
+                await asyncio.to_thread(self._remove_spill)
+                self._spill_offset = 0
+
+    def _load_spill_state(self) -> None:
+        assert self._spill_path is not None and self._offset_path is not None
+        if not self._spill_path.exists():
+            return
+        try:
+            self._spill_offset = int(self._offset_path.read_text()) if self._offset_path.exists() else 0
+            with open(self._spill_path, "rb") as f:
+                f.seek(self._spill_offset)
+                self._spill_unread = sum(1 for line in f if line.strip())
+        except Exception as e:
+            logger.warning(f"读取溢出文件状态失败，将从头重放: {e}")
+            self._spill_offset = 0
+
+    def _append(self, line: str) -> None:
+        assert self._spill_path is not None
+        self._spill_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._spill_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def _read_lines(self, offset: int, limit: int) -> Tuple[List[bytes], int]:
+        assert self._spill_path is not None
+        lines: List[bytes] = []
+        with open(self._spill_path, "rb") as f:
+            f.seek(offset)
+            while len(lines) < limit:
+                line = f.readline()
+                if not line:
+                    break
+                if line.strip():
+                    lines.append(line)
+            return lines, f.tell()
+
+    def _write_offset(self, offset: int) -> None:
+        assert self._offset_path is not None
+        self._offset_path.write_text(str(offset))
+
+    def _remove_spill(self) -> None:
+        for path in (self._spill_path, self._offset_path):
+            if path is not None:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+    def _persist(self, head: List[str]) -> None:
+        """把内存中的消息写到溢出文件中未读部分之前，重写为新的溢出文件"""
+        assert self._spill_path is not None
+        if not head:
+            if self._spill_unread:
+                self._write_offset(self._spill_offset)
+            return
+        self._spill_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._spill_path.with_suffix(self._spill_path.suffix + ".tmp")
+        with open(tmp, "wb") as out:
+            for line in head:
+                out.write(line.encode("utf-8") + b"\n")
+            if self._spill_unread and self._spill_path.exists():
+                with open(self._spill_path, "rb") as f:
+                    f.seek(self._spill_offset)
+                    while chunk := f.read(1024 * 1024):
+                        out.write(chunk)
+        os.replace(tmp, self._spill_path)
+        self._spill_offset = 0
+        self._remove_offset()
+
+    def _remove_offset(self) -> None:
+        assert self._offset_path is not None
+        try:
+            os.unlink(self._offset_path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,186 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from maim_message import MessageBase
+
+from ..config import global_config
+from ..logger import logger
+from .message_sending import message_send_instance
+
+LANE_PRIVATE = "private"
+LANE_MENTION = "mention"
+LANE_AMBIENT = "ambient"
+
+# MaiBot 不可立即接收时，检查其是否恢复的间隔（秒）
+READY_POLL_INTERVAL = 0.2
+
+
+class _Lane:
+    __slots__ = ("name", "weight", "max_size", "shed", "queue", "current", "sent", "dropped", "overflowed", "max_wait")
+
+    def __init__(self, name: str, weight: int, max_size: int, shed: bool) -> None:
+        self.name = name
+        self.weight = max(1, weight)
+        self.max_size = max(1, max_size)
+        # 队列满时丢弃最早的消息（True）还是让投递方等待（False）
+        self.shed = shed
+        self.queue: Deque[Tuple[float, MessageBase]] = deque()
+        self.current = 0
+        self.sent = 0
+        self.dropped = 0
+        # MaiBot 不可用期间因队列满提前转入发送缓冲的条数
+        self.overflowed = 0
+        self.max_wait = 0.0
+
+
+class PriorityScheduler:
+    """发往 MaiBot 前的优先级调度：私聊、@/回复 bot、群内普通消息分三条队列，按权重做平滑加权轮询。
+
+    send 本身不阻塞（断线时消息进入发送缓冲），因此只在 ready() 为真（MaiBot 已连接且发送缓冲无积压）时出队，
+    MaiBot 不可用期间消息留在各队列中，恢复后先被点名的消息先发。
+    普通群消息队列满时丢弃最早的一条；私聊与 @ 队列满时让处理方等待，MaiBot 不可用（或等待中变为不可用）时则把最早的一条转入发送缓冲
+    （可溢出到磁盘），避免长时间断线拖住 update 处理。
+    """
+
+    def __init__(
+        self,
+        send: Callable[[MessageBase], Awaitable[Any]],
+        *,
+        enabled: bool = True,
+        weights: Dict[str, int],
+        limits: Dict[str, int],
+        ready: Callable[[], bool] = lambda: True,
+    ) -> None:
+        self._send = send
+        self._ready = ready
+        self.enabled = enabled
+        self._lanes: Dict[str, _Lane] = {
+            name: _Lane(name, weights[name], limits[name], shed=name == LANE_AMBIENT)
+            for name in (LANE_PRIVATE, LANE_MENTION, LANE_AMBIENT)
+        }
+        self._cond = asyncio.Condition()
+        self._inflight = 0
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return sum(len(lane.queue) for lane in self._lanes.values())
+
+    async def submit(self, lane_name: str, message: MessageBase) -> None:
+        if not self.enabled:
+            await self._send(message)
+            return
+        lane = self._lanes[lane_name]
+        overflow: Optional[MessageBase] = None
+        async with self._cond:
+            if len(lane.queue) >= lane.max_size and lane.shed:
+                lane.queue.popleft()
+                lane.dropped += 1
+            # 等待期间 MaiBot 可能断开、worker 停止出队，因此定期醒来重新检查
+            while len(lane.queue) >= lane.max_size and self._ready():
+                try:
+                    await asyncio.wait_for(self._cond.wait(), READY_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+            if len(lane.queue) >= lane.max_size:
+                _, overflow = lane.queue.popleft()
+            lane.queue.append((time.monotonic(), message))
+            self._cond.notify_all()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._worker_loop(), name="maibot-priority-send")
+        if overflow is not None:
+            lane.overflowed += 1
+            await self._deliver(lane, overflow)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            lane.name: {
+                "queued": len(lane.queue),
+                "sent": lane.sent,
+                "dropped": lane.dropped,
+                "overflowed": lane.overflowed,
+                "max_wait_ms": round(lane.max_wait * 1000),
+            }
+            for lane in self._lanes.values()
+        }
+
+    async def close(self, timeout: float = 5) -> None:
+        """MaiBot 可用时等待已排队的消息发送完毕（最多 timeout 秒）后停止；
+        仍未发出的消息按优先级交给 send（即发送缓冲），由其持久化到溢出文件"""
+        if self._worker is None:
+            return
+        deadline = time.monotonic() + timeout
+        while (self.pending or self._inflight) and self._ready() and time.monotonic() < deadline:
+            await asyncio.sleep(READY_POLL_INTERVAL / 4)
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+        if self.pending:
+            logger.info(f"MaiBot 发送队列剩余 {self.pending} 条，转入发送缓冲")
+        while self.pending:
+            lane = self._pick()
+            _, message = lane.queue.popleft()
+            await self._deliver(lane, message)
+
+    def _pick(self) -> _Lane:
+        # 平滑加权轮询（只在非空队列间进行）：每轮各队列累加权重，取最大者并减去本轮权重总和
+        total = 0
+        best: Optional[_Lane] = None
+        for lane in self._lanes.values():
+            if not lane.queue:
+                continue
+            lane.current += lane.weight
+            total += lane.weight
+            if best is None or lane.current > best.current:
+                best = lane
+        assert best is not None
+        best.current -= total
+        return best
+
+    async def _worker_loop(self) -> None:
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: self.pending > 0)
+                if self._ready():
+                    lane = self._pick()
+                    enqueued, message = lane.queue.popleft()
+                    self._inflight += 1
+                    self._cond.notify_all()
+                else:
+                    lane = None
+            if lane is None:
+                # MaiBot 断线或发送缓冲仍在重放积压：消息留在队列中，恢复后再按优先级取出
+                await asyncio.sleep(READY_POLL_INTERVAL)
+                continue
+            lane.max_wait = max(lane.max_wait, time.monotonic() - enqueued)
+            try:
+                await self._deliver(lane, message)
+            finally:
+                async with self._cond:
+                    self._inflight -= 1
+                    self._cond.notify_all()
+
+    async def _deliver(self, lane: _Lane, message: MessageBase) -> None:
+        try:
+            await self._send(message)
+            lane.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"发送到 MaiBot 异常: {e}")
+
+
+_cfg = global_config.priority
+priority_scheduler = PriorityScheduler(
+    message_send_instance.message_send,
+    ready=message_send_instance.ready,
+    enabled=_cfg.enabled,
+    weights={LANE_PRIVATE: _cfg.private_weight, LANE_MENTION: _cfg.mention_weight, LANE_AMBIENT: _cfg.ambient_weight},
+    limits={
+        LANE_PRIVATE: _cfg.private_max_queue,
+        LANE_MENTION: _cfg.mention_max_queue,
+        LANE_AMBIENT: _cfg.ambient_max_queue,
+    },
+)
@@ -0,0 +1,181 @@
+import asyncio
+import os
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from .. import json_codec
+from ..logger import logger
+
+EDIT_FIELDS = ("edited_message", "edited_channel_post")
+
+
+class RecentSet:
+    """容量固定的去重集合：按插入顺序淘汰最早的元素"""
+
+    def __init__(self, maxlen: int) -> None:
+        self.maxlen = max(1, maxlen)
+        self._order: Deque[Any] = deque()
+        self._items: Set[Any] = set()
+
+    def __contains__(self, item: Any) -> bool:
+        return item in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._order)
+
+    def add(self, item: Any) -> None:
+        if item in self._items:
+            return
+        self._order.append(item)
+        self._items.add(item)
+        if len(self._order) > self.maxlen:
+            self._items.discard(self._order.popleft())
+
+
+def edit_key(update: Dict[str, Any]) -> Optional[str]:
+    """编辑类 update 的去重键：同一消息的同一次编辑只处理一次"""
+    for field in EDIT_FIELDS:
+        msg = update.get(field)
+        if msg:
+            chat_id = (msg.get("chat") or {}).get("id")
+            return f"{chat_id}:{msg.get('message_id')}:{msg.get('edit_date')}"
+    return None
+
+
+class UpdateTracker:
+    """记录 update 的处理进度：拉取偏移量、尚未处理完成的 update 以及近期 update_id，定期落盘。
+
+    update 被接受时记入待处理表，处理完成后才移除；落盘内容为下一次拉取的偏移量与待处理表，
+    重启后先重放待处理的 update 再从偏移量继续拉取，已处理过的 update_id 不会重复处理。
+    """
+
+    def __init__(
+        self,
+        *,
+        persist_path: Optional[str] = None,
+        commit_interval: float = 1.0,
+        dedupe_window: int = 2048,
+    ) -> None:
+        self._path: Optional[Path] = Path(persist_path) if persist_path else None
+        self._commit_interval = max(0.0, commit_interval)
+        self._recent = RecentSet(dedupe_window)
+        self._recent_edits = RecentSet(dedupe_window)
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._offset: Optional[int] = None
+        self._dirty = False
+        self._commit_task: Optional[asyncio.Task] = None
+        self.duplicates = 0
+        if self._path is not None:
+            self._load()
+
+    @property
+    def next_offset(self) -> Optional[int]:
+        return self._offset
+
+    def restore_pending(self) -> List[Dict[str, Any]]:
+        """上次退出时尚未处理完成的 update，按 update_id 顺序返回"""
+        return [self._pending[uid] for uid in sorted(self._pending)]
+
+    def accept(self, update: Dict[str, Any]) -> bool:
+        """登记新到达的 update；重复的 update_id 或同一次编辑返回 False"""
+        update_id = update.get("update_id")
+        if not isinstance(update_id, int):
+            return True
+        if self._offset is None or update_id >= self._offset:
+            self._offset = update_id + 1
+        key = edit_key(update)
+        if update_id in self._recent or (key is not None and key in self._recent_edits):
+            self.duplicates += 1
+            return False
+        self._recent.add(update_id)
+        if key is not None:
+            self._recent_edits.add(key)
+        self._pending[update_id] = update
+        self._mark_dirty()
+        return True
+
+    def done(self, update: Dict[str, Any]) -> None:
+        if self._pending.pop(update.get("update_id"), None) is not None:
+            self._mark_dirty()
+
+    def stats(self) -> Dict[str, int]:
+        return {"pending": len(self._pending), "duplicates": self.duplicates, "offset": self._offset or 0}
+
+    async def close(self) -> None:
+        """取消定时提交并立即落盘"""
+        if self._commit_task is not None and not self._commit_task.done():
+            self._commit_task.cancel()
+            await asyncio.gather(self._commit_task, return_exceptions=True)
+        self.commit()
+
+    def commit(self) -> None:
+        if self._path is None or not self._dirty:
+            return
+        try:
+            self._write(self._snapshot())
+            self._dirty = False
+        except Exception as e:
+            logger.warning(f"保存 update 处理进度失败: {e}")
+
+    def _mark_dirty(self) -> None:
+        self._dirty = True
+        if self._path is None:
+            return
+        if self._commit_task is None or self._commit_task.done():
+            self._commit_task = asyncio.create_task(self._commit_later())
+
+    async def _commit_later(self) -> None:
+        # 合并一个提交周期内的所有变更，只写一次；写盘期间又有变更时继续下一个周期
+        while self._dirty:
+            await asyncio.sleep(self._commit_interval)
+            self._dirty = False
+            try:
+                await asyncio.to_thread(self._write, self._snapshot())
+            except Exception as e:
+                self._dirty = True
+                logger.warning(f"保存 update 处理进度失败: {e}")
+                return
+
+    def _snapshot(self) -> str:
+        # 在事件循环线程中序列化，写盘线程只接触字符串
+        return json_codec.dumps(
+            {
+                "offset": self._offset,
+                "pending": [self._pending[uid] for uid in sorted(self._pending)],
+                "recent": list(self._recent),
+                "recent_edits": list(self._recent_edits),
+            }
+        )
+
+    def _load(self) -> None:
+        assert self._path is not None
+        if not self._path.exists():
+            return
+        try:
+            with open(self._path, "rb") as f:
+                state = json_codec.loads(f.read())
+        except Exception as e:
+            logger.warning(f"读取 update 处理进度失败，将从 Telegram 当前进度开始: {e}")
+            return
+        self._offset = state.get("offset")
+        for update_id in state.get("recent") or []:
+            self._recent.add(update_id)
+        for key in state.get("recent_edits") or []:
+            self._recent_edits.add(key)
+        for update in state.get("pending") or []:
+            update_id = update.get("update_id")
+            if isinstance(update_id, int):
+                self._pending[update_id] = update
+                self._recent.add(update_id)
+
+    def _write(self, data: str) -> None:
+        assert self._path is not None
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self._path)
@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..logger import logger
+from ..config import global_config
+
+# 距上次落盘超过该秒数且有改动时，在后台线程中保存一次
+AUTOSAVE_INTERVAL = 60
+
+
+class FileIdCache:
+    """出站媒体 file_id 复用缓存：内容哈希 -> 首次上传后 Telegram 返回的 file_id，LRU 淘汰并持久化到磁盘"""
+
+    def __init__(self, *, max_entries: int = 10000, persist_path: Optional[str] = None) -> None:
+        self.max_entries = max(0, max_entries)
+        self._path: Optional[Path] = Path(persist_path) if persist_path else None
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._save_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        if self._path is not None and self.max_entries > 0:
+            self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def key(kind: str, b64: str) -> str:
+        # 直接对 base64 文本求哈希：命中时连解码都可以省掉
+        return f"{kind}:{hashlib.sha256(b64.encode('ascii', 'ignore')).hexdigest()}"
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        file_id = self._entries.get(key)
+        if file_id is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return file_id
+
+    def put(self, key: str, file_id: str) -> None:
+        if not self.enabled or not file_id:
+            return
+        self._entries[key] = file_id
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._mark_dirty()
+
+    def discard(self, key: str) -> None:
+        if self._entries.pop(key, None) is not None:
+            self._mark_dirty()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def save(self) -> None:
+        if self._path is None or not self._dirty:
+            return
+        try:
+            self._write(list(self._entries.items()))
+            self._dirty = False
+        except Exception as e:
+            logger.warning(f"保存 file_id 缓存失败: {e}")
+
+    def _mark_dirty(self) -> None:
+        self._dirty = True
+        if self._path is None or time.monotonic() - self._last_save < AUTOSAVE_INTERVAL:
+            return
+        if self._save_task is not None and not self._save_task.done():
+            return
+        self._last_save = time.monotonic()
+        self._dirty = False
+        self._save_task = asyncio.create_task(asyncio.to_thread(self._write, list(self._entries.items())))
+        self._save_task.add_done_callback(self._on_saved)
+
+    def _on_saved(self, task: asyncio.Task) -> None:
+        if task.cancelled() or task.exception() is not None:
+            self._dirty = True
+            if not task.cancelled():
+                logger.warning(f"保存 file_id 缓存失败: {task.exception()}")
+
+    def _load(self) -> None:
+        assert self._path is not None
+        if not self._path.exists():
+            return
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                items: List[Tuple[str, str]] = json.load(f)
+        except Exception as e:
+            logger.warning(f"读取 file_id 缓存失败，将重新建立: {e}")
+            return
+        for key, file_id in items[-self.max_entries :]:
+            self._entries[key] = file_id
+
+    def _write(self, items: List[Tuple[str, str]]) -> None:
+        assert self._path is not None
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(items, f)
+        os.replace(tmp, self._path)
+
+
+def extract_file_id(result: Dict[str, Any], kind: str) -> Optional[str]:
+    """从 send* 的返回消息中取出可复用的 file_id"""
+    message = result.get("result") or {}
+    if kind == "photo":
+        sizes = message.get("photo") or []
+        return sizes[-1].get("file_id") if sizes else None
+    if kind == "animation":
+        media = message.get("animation") or message.get("document") or {}
+        return media.get("file_id")
+    media = message.get(kind) or {}
+    return media.get("file_id")
+
+
+# 失效/不可用 file_id 对应的 400 错误描述片段（小写）；其余 400（如回复目标或会话不存在）重新上传也无济于事
+STALE_FILE_ID_MARKERS = (
+    "wrong file identifier",
+    "wrong remote file identifier",
+    "wrong file_id",
+    "file_id_invalid",
+    "file_reference_",
+)
+
+
+def is_stale_file_id_error(result: Dict[str, Any]) -> bool:
+    if result.get("ok") or result.get("error_code") != 400:
+        return False
+    description = str(result.get("description") or "").lower()
+    return any(marker in description for marker in STALE_FILE_ID_MARKERS)
+
+
+_cfg = global_config.file_id_cache
+file_id_cache = FileIdCache(
+    max_entries=_cfg.max_entries if _cfg.enabled else 0,
+    persist_path=_cfg.persist_path or None,
+)
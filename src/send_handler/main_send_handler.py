@@ -1,4 +1,5 @@
-from typing import Any, Dict, List
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
 
 from maim_message import (
     UserInfo,
@@ -8,10 +9,24 @@ from maim_message import (
     MessageBase,
 )
 
-from ..logger import logger
+from ..logger import logger, sampled
 from ..config import global_config
+from ..utils import split_text, utf16_len
 from . import tg_sending
 
+ALBUM_SEG_TYPES = ("image", "imageurl")
+ALBUM_MIN_SIZE = 2
+ALBUM_MAX_SIZE = 10
+# 媒体说明文字上限（UTF-16 码元）
+CAPTION_LIMIT = 1024
+
+
+class Album(NamedTuple):
+    """合并为一次 sendMediaGroup 发送的一组图片"""
+
+    images: List[Seg]
+    caption: Optional[str] = None
+
 
 class SendHandler:
     def __init__(self):
@@ -19,9 +34,18 @@ class SendHandler:
 
     async def handle_message(self, raw_message_base_dict: dict) -> None:
         raw_message_base: MessageBase = MessageBase.from_dict(raw_message_base_dict)
-        message_segment: Seg = raw_message_base.message_segment
-        logger.info("接收到来自MaiBot的消息，处理中")
-        return await self.send_normal_message(raw_message_base)
+        started = time.perf_counter()
+        await self.send_normal_message(raw_message_base)
+        # 每条 MaiBot 消息一行汇总；production 下按 sample_every 抽样
+        if sampled("maibot_message"):
+            message_info = raw_message_base.message_info
+            target = message_info.group_info or message_info.user_info
+            logger.info(
+                "已处理来自MaiBot的消息 | chat={} msg={} cost={:.0f}ms",
+                getattr(target, "group_id", None) or getattr(target, "user_id", None),
+                message_info.message_id,
+                (time.perf_counter() - started) * 1000,
+            )
 
     async def send_normal_message(self, raw_message_base: MessageBase) -> None:
         if tg_sending.tg_message_sender is None:
@@ -46,30 +70,89 @@ class SendHandler:
         # 解析 reply 目标
         reply_to: int | None = self._extract_reply(message_segment, message_info)
 
-        # 扁平化 seglist 后按顺序发送（简单串行，避免复杂聚合）
-        payloads = self._recursively_flatten(message_segment)
+        # 扁平化 seglist，合并相邻文本、连续图片合并为相册后按顺序发送
+        payloads = self._group_albums(self._coalesce_text(self._recursively_flatten(message_segment)))
         if not payloads:
             logger.warning("消息段为空，不发送")
             return
 
+        sender = tg_sending.tg_message_sender
         for seg in payloads:
+            if isinstance(seg, Album):
+                result = await sender.send_image_group(chat_id, seg.images, seg.caption, reply_to)
+                reply_to = None
+                self._check_result(result, "album", chat_id)
+                continue
             if seg.type == "text":
-                await tg_sending.tg_message_sender.send_text(chat_id, seg.data, reply_to)
-                reply_to = None  # 仅第一条携带回复
+                for chunk in split_text(seg.data):
+                    result = await sender.send_text(chat_id, chunk, reply_to)
+                    reply_to = None  # 仅第一条携带回复
+                    self._check_result(result, seg.type, chat_id)
+                continue
             elif seg.type == "image":
-                await tg_sending.tg_message_sender.send_image_base64(chat_id, seg.data)
+                result = await sender.send_image_base64(chat_id, seg.data)
             elif seg.type == "imageurl":
-                await tg_sending.tg_message_sender.send_image_url(chat_id, seg.data)
+                result = await sender.send_image_url(chat_id, seg.data)
             elif seg.type == "voice":
-                await tg_sending.tg_message_sender.send_voice_base64(chat_id, seg.data)
+                result = await sender.send_voice_base64(chat_id, seg.data)
             elif seg.type == "videourl":
-                await tg_sending.tg_message_sender.send_video_url(chat_id, seg.data)
+                result = await sender.send_video_url(chat_id, seg.data)
             elif seg.type == "file":
-                await tg_sending.tg_message_sender.send_document_url(chat_id, seg.data)
+                result = await sender.send_document_url(chat_id, seg.data)
             elif seg.type == "emoji":
-                await tg_sending.tg_message_sender.send_animation_base64(chat_id, seg.data)
+                result = await sender.send_animation_base64(chat_id, seg.data)
             else:
                 logger.debug(f"跳过不支持的发送类型: {seg.type}")
+                continue
+            self._check_result(result, seg.type, chat_id)
+
+    def _check_result(self, result: Dict[str, Any], seg_type: str, chat_id: int | str) -> None:
+        if not result.get("ok"):
+            logger.warning(
+                f"发送 {seg_type} 到 Telegram 失败(chat_id={chat_id}): "
+                f"{result.get('error_code')} {result.get('description')}"
+            )
+
+    def _coalesce_text(self, segs: List[Seg]) -> List[Seg]:
+        """把连续的文本段拼成一段（与 QQ 侧同一 seglist 内文本直接相连的表现一致），减少 sendMessage 次数"""
+        merged: List[Seg] = []
+        for seg in segs:
+            if seg.type == "text" and merged and merged[-1].type == "text":
+                merged[-1] = Seg(type="text", data=merged[-1].data + seg.data)
+            else:
+                merged.append(seg)
+        return merged
+
+    def _group_albums(self, segs: List[Seg]) -> List[Seg | Album]:
+        """把 2~10 张连续图片合并为相册；紧随其后且长度合法的文本作为相册说明"""
+        grouped: List[Seg | Album] = []
+        i = 0
+        while i < len(segs):
+            if segs[i].type not in ALBUM_SEG_TYPES:
+                grouped.append(segs[i])
+                i += 1
+                continue
+            j = i
+            while j < len(segs) and segs[j].type in ALBUM_SEG_TYPES:
+                j += 1
+            run = segs[i:j]
+            chunks = [run[k : k + ALBUM_MAX_SIZE] for k in range(0, len(run), ALBUM_MAX_SIZE)]
+            caption: Optional[str] = None
+            if (
+                len(chunks[-1]) >= ALBUM_MIN_SIZE
+                and j < len(segs)
+                and segs[j].type == "text"
+                and 0 < utf16_len(segs[j].data) <= CAPTION_LIMIT
+            ):
+                caption = segs[j].data
+                j += 1
+            for n, chunk in enumerate(chunks):
+                if len(chunk) < ALBUM_MIN_SIZE:
+                    grouped.extend(chunk)
+                else:
+                    grouped.append(Album(chunk, caption if n == len(chunks) - 1 else None))
+            i = j
+        return grouped
 
     def _recursively_flatten(self, seg_data: Seg) -> List[Seg]:
         items: List[Seg] = []
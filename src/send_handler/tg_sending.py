@@ -1,9 +1,11 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from maim_message import MessageBase
+from maim_message import MessageBase, Seg
 
 from ..logger import logger
+from ..media_codec import b64decode
 from ..telegram_client import TelegramClient
+from .file_id_cache import FileIdCache, file_id_cache, extract_file_id, is_stale_file_id_error
 
 
 class TGMessageSender:
@@ -24,23 +26,68 @@ class TGMessageSender:
         return await self.client.send_message(chat_id, text, reply_to)
 
     async def send_image_base64(self, chat_id: int | str, b64: str, caption: Optional[str] = None) -> Dict[str, Any]:
-        import base64
-
-        try:
-            image_bytes = base64.b64decode(b64)
-        except Exception as e:
-            logger.error(f"图片base64解析失败: {e}")
-            return {"ok": False, "description": "invalid base64"}
-        return await self.client.send_photo_by_bytes(chat_id, image_bytes, caption)
+        return await self._send_base64_media("photo", chat_id, b64, caption)
 
     async def send_image_url(self, chat_id: int | str, url: str, caption: Optional[str] = None) -> Dict[str, Any]:
         return await self.client.send_photo_by_url(chat_id, url, caption)
 
-    async def send_voice_base64(self, chat_id: int | str, b64: str, caption: Optional[str] = None) -> Dict[str, Any]:
-        import base64
+    async def send_image_group(
+        self, chat_id: int | str, images: List[Seg], caption: Optional[str] = None, reply_to: Optional[int] = None
+    ) -> Dict[str, Any]:
+        keys = [
+            FileIdCache.key("photo", seg.data) if seg.type == "image" and file_id_cache.enabled else None
+            for seg in images
+        ]
+        cached = [file_id_cache.get(k) if k else None for k in keys]
+        result, sent = await self._send_image_group(chat_id, images, cached, caption, reply_to)
+        if any(cached) and is_stale_file_id_error(result):
+            logger.debug("相册中缓存的 file_id 已失效，重新上传")
+            for k, file_id in zip(keys, cached, strict=True):
+                if k and file_id:
+                    file_id_cache.discard(k)
+            cached = [None] * len(images)
+            result, sent = await self._send_image_group(chat_id, images, cached, caption, reply_to)
+        if result.get("ok") and isinstance(result.get("result"), list):
+            # 正常情况下每张图片对应一条返回消息；数量不符时只缓存能对应上的部分
+            for idx, message in zip(sent, result["result"], strict=False):
+                if keys[idx] and not cached[idx]:
+                    file_id_cache.put(keys[idx], extract_file_id({"result": message}, "photo"))
+        return result
+
+    async def _send_image_group(
+        self,
+        chat_id: int | str,
+        images: List[Seg],
+        cached: List[Optional[str]],
+        caption: Optional[str],
+        reply_to: Optional[int],
+    ) -> Tuple[Dict[str, Any], List[int]]:
+        """返回发送结果以及实际发出的图片在 images 中的下标（跳过无法解析的图片）"""
+        media: List[bytes | bytearray | str] = []
+        sent: List[int] = []
+        for idx, (seg, file_id) in enumerate(zip(images, cached, strict=True)):
+            if file_id:
+                media.append(file_id)
+            elif seg.type == "imageurl":
+                media.append(seg.data)
+            else:
+                try:
+                    media.append(await b64decode(seg.data))
+                except Exception as e:
+                    logger.error(f"相册图片base64解析失败，已跳过: {e}")
+                    continue
+            sent.append(idx)
+        if not media:
+            return {"ok": False, "description": "invalid base64"}, sent
+        if len(media) == 1:
+            if isinstance(media[0], str):
+                return await self.client.send_photo_by_url(chat_id, media[0], caption, reply_to), sent
+            return await self.client.send_photo_by_bytes(chat_id, media[0], caption, reply_to), sent
+        return await self.client.send_media_group(chat_id, media, caption, reply_to), sent
 
+    async def send_voice_base64(self, chat_id: int | str, b64: str, caption: Optional[str] = None) -> Dict[str, Any]:
         try:
-            voice_bytes = base64.b64decode(b64)
+            voice_bytes = await b64decode(b64)
         except Exception as e:
             logger.error(f"语音base64解析失败: {e}")
             return {"ok": False, "description": "invalid base64"}
@@ -53,14 +100,34 @@ class TGMessageSender:
         return await self.client.send_document_by_url(chat_id, url, caption)
 
     async def send_animation_base64(self, chat_id: int | str, b64: str, caption: Optional[str] = None) -> Dict[str, Any]:
-        import base64
+        return await self._send_base64_media("animation", chat_id, b64, caption)
+
+    async def _send_base64_media(
+        self, kind: str, chat_id: int | str, b64: str, caption: Optional[str]
+    ) -> Dict[str, Any]:
+        """发送 base64 图片/动图：内容已上传过时直接按 file_id 发送，file_id 失效时回退为重新上传"""
+        by_file_id, by_bytes, desc = {
+            "photo": (self.client.send_photo_by_file_id, self.client.send_photo_by_bytes, "图片"),
+            "animation": (self.client.send_animation_by_file_id, self.client.send_animation_by_bytes, "动图"),
+        }[kind]
+        key = FileIdCache.key(kind, b64) if file_id_cache.enabled else None
+        file_id = file_id_cache.get(key) if key else None
+        if file_id:
+            result = await by_file_id(chat_id, file_id, caption)
+            if not is_stale_file_id_error(result):
+                return result
+            logger.debug(f"缓存的{desc} file_id 已失效，重新上传: {result.get('description')}")
+            file_id_cache.discard(key)
 
         try:
-            anim_bytes = base64.b64decode(b64)
+            data = await b64decode(b64)
         except Exception as e:
-            logger.error(f"动图base64解析失败: {e}")
+            logger.error(f"{desc}base64解析失败: {e}")
             return {"ok": False, "description": "invalid base64"}
-        return await self.client.send_animation_by_bytes(chat_id, anim_bytes, caption)
+        result = await by_bytes(chat_id, data, caption)
+        if key and result.get("ok"):
+            file_id_cache.put(key, extract_file_id(result, kind))
+        return result
 
 
 tg_message_sender: TGMessageSender | None = None
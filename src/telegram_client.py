@@ -1,9 +1,27 @@
 import asyncio
-from typing import Any, Dict, List, Optional
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import aiohttp
 from urllib.parse import urlparse
 
+from . import json_codec, media_codec, tg_schema
+from .logger import logger
+from .utils import Base64StreamEncoder
+from .rate_limit import SendScheduler
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# 长轮询请求在 Bot API 的 timeout 之外额外留出的网络余量（秒）
+POLL_TIMEOUT_MARGIN = 15
+
+
+class TelegramFileTooLarge(Exception):
+    """待下载文件超过 max_download_bytes 限制"""
+
 
 class TelegramClient:
     def __init__(
@@ -14,32 +32,102 @@ class TelegramClient:
         proxy_url: Optional[str] = None,
         proxy_enabled: bool = False,
         proxy_from_env: bool = False,
+        file_path_ttl: float = 3000,
+        file_path_cache_size: int = 4096,
+        max_concurrent_downloads: int = 8,
+        max_download_bytes: int = 20 * 1024 * 1024,
+        send_scheduler: Optional[SendScheduler] = None,
+        pool_size: int = 100,
+        keepalive_timeout: float = 30.0,
+        dns_cache_ttl: int = 300,
+        api_timeout: float = 30.0,
+        download_timeout: float = 120.0,
+        upload_timeout: float = 120.0,
+        local_mode: bool = False,
+        local_upload_dir: str = "",
+        compact_updates: bool = False,
     ) -> None:
         self.token = token
         self.api_base = api_base.rstrip("/")
+        # 发送/下载共用的连接池会话，与阻塞式长轮询会话分开，避免互相占用连接与超时设置
         self._session: Optional[aiohttp.ClientSession] = None
+        self._poll_session: Optional[aiohttp.ClientSession] = None
+        self._pool_size = max(1, pool_size)
+        self._keepalive_timeout = keepalive_timeout
+        self._dns_cache_ttl = dns_cache_ttl
+        self._api_timeout = aiohttp.ClientTimeout(total=api_timeout)
+        self._download_timeout = aiohttp.ClientTimeout(total=download_timeout)
+        self._upload_timeout = aiohttp.ClientTimeout(total=upload_timeout)
         self._proxy_url: Optional[str] = proxy_url if proxy_enabled and proxy_url else None
         self._proxy_is_socks = self._is_socks(self._proxy_url) if self._proxy_url else False
         self._trust_env: bool = bool(proxy_from_env)
+        # getFile 结果缓存：Telegram 保证 file_path 至少 1 小时有效
+        self._file_path_ttl = file_path_ttl
+        self._file_path_cache_size = max(1, file_path_cache_size)
+        self._file_path_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._file_path_inflight: Dict[str, asyncio.Task] = {}
+        # 进程内并发下载上限，避免媒体突发时压垮 Bot API
+        self._download_semaphore = asyncio.Semaphore(max(1, max_concurrent_downloads))
+        self._max_download_bytes = max_download_bytes
+        # 出站限流调度；为 None 时直接发送
+        self._scheduler = send_scheduler
+        # 本地 Bot API 服务器（--local）：getFile 返回服务器磁盘上的绝对路径，入站直接读盘、出站以 file:// 传路径。
+        # 未显式开启时，若 getFile 返回的绝对路径在本机可读，则自动按本地模式读取入站文件
+        self._local_mode = local_mode
+        self._local_files_detected = False
+        self._local_upload_dir = local_upload_dir or tempfile.gettempdir()
+        # getUpdates 结果只保留接收侧用到的字段（见 tg_schema，需要 msgspec）
+        self._compact_updates = compact_updates and tg_schema.AVAILABLE
 
     async def ensure_session(self) -> aiohttp.ClientSession:
         if self._session is None or self._session.closed:
-            timeout = aiohttp.ClientTimeout(total=60)
-            connector = None
-            if self._proxy_is_socks and self._proxy_url:
-                try:
-                    from aiohttp_socks import ProxyConnector  # type: ignore
-
-                    connector = ProxyConnector.from_url(self._proxy_url)
-                except Exception as e:
-                    # 不阻断初始化，后续请求会失败并提示
-                    print(f"[telegram_client] 警告：SOCKS 代理初始化失败: {e}")
-            self._session = aiohttp.ClientSession(timeout=timeout, connector=connector, trust_env=self._trust_env)
+            self._session = self._new_session(self._pool_size, self._api_timeout)
         return self._session
 
+    async def ensure_poll_session(self) -> aiohttp.ClientSession:
+        if self._poll_session is None or self._poll_session.closed:
+            # 超时按每次 getUpdates 的 timeout 单独设置
+            self._poll_session = self._new_session(1, aiohttp.ClientTimeout(total=None))
+        return self._poll_session
+
+    def _new_session(self, limit: int, timeout: aiohttp.ClientTimeout) -> aiohttp.ClientSession:
+        connector_kwargs: Dict[str, Any] = {
+            "limit": limit,
+            "limit_per_host": limit,
+            "keepalive_timeout": self._keepalive_timeout,
+            "ttl_dns_cache": self._dns_cache_ttl,
+        }
+        connector: Optional[aiohttp.BaseConnector] = None
+        if self._proxy_is_socks and self._proxy_url:
+            try:
+                from aiohttp_socks import ProxyConnector  # type: ignore
+
+                connector = ProxyConnector.from_url(self._proxy_url, **connector_kwargs)
+            except Exception as e:
+                # 不阻断初始化，后续请求会失败并提示
+                print(f"[telegram_client] 警告：SOCKS 代理初始化失败: {e}")
+        if connector is None:
+            connector = aiohttp.TCPConnector(**connector_kwargs)
+        return aiohttp.ClientSession(
+            timeout=timeout,
+            connector=connector,
+            trust_env=self._trust_env,
+            json_serialize=json_codec.dumps,
+        )
+
+    async def warmup(self, connections: int = 2) -> None:
+        """启动时预先建立若干到 Bot API 的连接（含 TLS 握手），让开机后的第一条回复不必再付出建连开销"""
+        if connections <= 0:
+            return
+        results = await asyncio.gather(*[self.get_me() for _ in range(connections)], return_exceptions=True)
+        failed = [r for r in results if isinstance(r, BaseException)]
+        if failed:
+            logger.warning(f"连接预热失败 {len(failed)}/{connections}: {failed[0]}")
+
     async def close(self) -> None:
-        if self._session and not self._session.closed:
-            await self._session.close()
+        for session in (self._session, self._poll_session):
+            if session and not session.closed:
+                await session.close()
 
     def _url(self, method: str) -> str:
         return f"{self.api_base}/bot{self.token}/{method}"
@@ -47,124 +135,338 @@ class TelegramClient:
     async def get_me(self) -> Dict[str, Any]:
         session = await self.ensure_session()
         async with session.get(self._url("getMe"), proxy=self._http_proxy()) as resp:
-            return await resp.json()
+            return await self._read_json(resp)
 
     async def get_updates(
         self,
         offset: Optional[int] = None,
         timeout: int = 20,
         allowed_updates: Optional[List[str]] = None,
+        limit: Optional[int] = None,
     ) -> Dict[str, Any]:
-        session = await self.ensure_session()
+        session = await self.ensure_poll_session()
         payload: Dict[str, Any] = {"timeout": timeout}
         if offset is not None:
             payload["offset"] = offset
+        if limit is not None:
+            payload["limit"] = limit
         if allowed_updates is not None:
             payload["allowed_updates"] = allowed_updates
         async with session.post(
-            self._url("getUpdates"), json=payload, proxy=self._http_proxy()
+            self._url("getUpdates"),
+            json=payload,
+            proxy=self._http_proxy(),
+            timeout=aiohttp.ClientTimeout(total=timeout + POLL_TIMEOUT_MARGIN),
         ) as resp:
-            return await resp.json()
+            if self._compact_updates:
+                return tg_schema.decode_updates(await resp.read())
+            return await self._read_json(resp)
+
+    async def set_webhook(
+        self,
+        url: str,
+        secret_token: Optional[str] = None,
+        allowed_updates: Optional[List[str]] = None,
+        drop_pending_updates: bool = False,
+    ) -> Dict[str, Any]:
+        session = await self.ensure_session()
+        payload: Dict[str, Any] = {"url": url, "drop_pending_updates": drop_pending_updates}
+        if secret_token:
+            payload["secret_token"] = secret_token
+        if allowed_updates is not None:
+            payload["allowed_updates"] = allowed_updates
+        async with session.post(
+            self._url("setWebhook"), json=payload, proxy=self._http_proxy()
+        ) as resp:
+            return await self._read_json(resp)
+
+    async def delete_webhook(self, drop_pending_updates: bool = False) -> Dict[str, Any]:
+        session = await self.ensure_session()
+        async with session.post(
+            self._url("deleteWebhook"), json={"drop_pending_updates": drop_pending_updates}, proxy=self._http_proxy()
+        ) as resp:
+            return await self._read_json(resp)
 
     async def get_file_path(self, file_id: str) -> Optional[str]:
+        if self._file_path_ttl <= 0:
+            return await self._fetch_file_path(file_id)
+        cached = self._file_path_cache.get(file_id)
+        if cached is not None:
+            expires_at, file_path = cached
+            if expires_at > time.monotonic():
+                self._file_path_cache.move_to_end(file_id)
+                return file_path
+            del self._file_path_cache[file_id]
+        # 同一 file_id 的并发查询合并为一次 getFile 请求
+        task = self._file_path_inflight.get(file_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_file_path(file_id))
+            self._file_path_inflight[file_id] = task
+            task.add_done_callback(lambda t: self._on_file_path_fetched(file_id, t))
+        # shield：单个调用方被取消时不影响其他等待同一结果的调用方
+        return await asyncio.shield(task)
+
+    def _on_file_path_fetched(self, file_id: str, task: asyncio.Task) -> None:
+        self._file_path_inflight.pop(file_id, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        file_path = task.result()
+        if not file_path:
+            return
+        self._file_path_cache[file_id] = (time.monotonic() + self._file_path_ttl, file_path)
+        self._file_path_cache.move_to_end(file_id)
+        while len(self._file_path_cache) > self._file_path_cache_size:
+            self._file_path_cache.popitem(last=False)
+
+    async def _fetch_file_path(self, file_id: str) -> Optional[str]:
         session = await self.ensure_session()
         async with session.post(
             self._url("getFile"), json={"file_id": file_id}, proxy=self._http_proxy()
         ) as resp:
-            data = await resp.json()
+            data = await self._read_json(resp)
             if data.get("ok") and data.get("result"):
                 return data["result"].get("file_path")
         return None
 
-    async def download_file_bytes(self, file_path: str) -> bytes:
+    @property
+    def local_files(self) -> bool:
+        return self._local_mode or self._local_files_detected
+
+    def check_download_size(self, file_size: Optional[int]) -> None:
+        # 本地模式下没有 20 MB 的下载限制，文件直接从磁盘读取
+        if self.local_files:
+            return
+        limit = self._max_download_bytes
+        if limit > 0 and file_size and file_size > limit:
+            raise TelegramFileTooLarge(f"文件大小 {file_size} 超过限制 {limit}")
+
+    def _is_local_file(self, file_path: str) -> bool:
+        if not os.path.isabs(file_path) or not os.path.isfile(file_path):
+            return False
+        if not self._local_files_detected:
+            self._local_files_detected = True
+            logger.info("检测到本地 Bot API 服务器，入站文件将直接从磁盘读取")
+        return True
+
+    async def download_file_base64(self, file_path: str, file_size: Optional[int] = None) -> str:
+        """流式下载文件并逐块编码为 base64；已知大小（消息中的 file_size 或 Content-Length）超限时不发起/中止下载。
+        本地 Bot API 服务器返回本机绝对路径时改为内存映射读盘。"""
+        if self._is_local_file(file_path):
+            return await media_codec.b64encode_file(file_path)
+        self.check_download_size(file_size)
+        limit = self._max_download_bytes
         session = await self.ensure_session()
-        # GET https://api.telegram.org/file/bot<token>/<file_path>
         file_url = f"{self.api_base}/file/bot{self.token}/{file_path}"
-        async with session.get(file_url, proxy=self._http_proxy()) as resp:
-            resp.raise_for_status()
-            return await resp.read()
+        async with self._download_semaphore:
+            async with session.get(file_url, proxy=self._http_proxy(), timeout=self._download_timeout) as resp:
+                resp.raise_for_status()
+                expected = resp.content_length or file_size or 0
+                if limit > 0 and expected > limit:
+                    raise TelegramFileTooLarge(f"文件大小 {expected} 超过限制 {limit}")
+                encoder = Base64StreamEncoder(expected)
+                received = 0
+                async for chunk in resp.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    received += len(chunk)
+                    if limit > 0 and received > limit:
+                        raise TelegramFileTooLarge(f"文件大小超过限制 {limit}")
+                    encoder.update(chunk)
+                return encoder.finish()
 
     async def send_message(self, chat_id: int | str, text: str, reply_to: Optional[int] = None) -> Dict[str, Any]:
-        session = await self.ensure_session()
         payload: Dict[str, Any] = {"chat_id": chat_id, "text": text}
         if reply_to is not None:
             payload["reply_parameters"] = {"message_id": reply_to}
-        async with session.post(
-            self._url("sendMessage"), json=payload, proxy=self._http_proxy()
-        ) as resp:
-            return await resp.json()
+        return await self._send("sendMessage", chat_id, json=payload)
 
-    async def send_photo_by_bytes(self, chat_id: int | str, photo_bytes: bytes, caption: Optional[str] = None) -> Dict[str, Any]:
-        session = await self.ensure_session()
-        form = aiohttp.FormData()
-        form.add_field("chat_id", str(chat_id))
-        if caption:
-            form.add_field("caption", caption)
-        form.add_field("photo", photo_bytes, filename="image.jpg", content_type="image/jpeg")
-        async with session.post(
-            self._url("sendPhoto"), data=form, proxy=self._http_proxy()
-        ) as resp:
-            return await resp.json()
+    async def send_photo_by_bytes(
+        self, chat_id: int | str, photo_bytes: bytes, caption: Optional[str] = None, reply_to: Optional[int] = None
+    ) -> Dict[str, Any]:
+        return await self._send_upload(
+            "sendPhoto", "photo", chat_id, photo_bytes, "image.jpg", "image/jpeg", caption, reply_to
+        )
 
-    async def send_photo_by_url(self, chat_id: int | str, url: str, caption: Optional[str] = None) -> Dict[str, Any]:
-        session = await self.ensure_session()
+    async def send_photo_by_url(
+        self, chat_id: int | str, url: str, caption: Optional[str] = None, reply_to: Optional[int] = None
+    ) -> Dict[str, Any]:
         payload: Dict[str, Any] = {"chat_id": chat_id, "photo": url}
         if caption:
             payload["caption"] = caption
-        async with session.post(
-            self._url("sendPhoto"), json=payload, proxy=self._http_proxy()
-        ) as resp:
-            return await resp.json()
+        if reply_to is not None:
+            payload["reply_parameters"] = {"message_id": reply_to}
+        return await self._send("sendPhoto", chat_id, json=payload)
+
+    async def send_photo_by_file_id(
+        self, chat_id: int | str, file_id: str, caption: Optional[str] = None
+    ) -> Dict[str, Any]:
+        # photo 字段同时接受 URL 与已上传的 file_id
+        return await self.send_photo_by_url(chat_id, file_id, caption)
+
+    async def send_media_group(
+        self,
+        chat_id: int | str,
+        photos: List[bytes | bytearray | str],
+        caption: Optional[str] = None,
+        reply_to: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """以相册形式发送 2~10 张图片；bytes 通过 multipart 的 attach:// 字段上传，str 视为 URL 或 file_id"""
+        media: List[Dict[str, Any]] = []
+        uploads: List[tuple[int, bytes | bytearray]] = []
+        for i, photo in enumerate(photos):
+            item: Dict[str, Any] = {"type": "photo"}
+            if isinstance(photo, (bytes, bytearray)):
+                uploads.append((i, photo))
+                item["media"] = f"attach://photo{i}"
+            else:
+                item["media"] = photo
+            if i == 0 and caption:
+                item["caption"] = caption
+            media.append(item)
+        reply_parameters = {"message_id": reply_to} if reply_to is not None else None
+
+        if not uploads or self._local_mode:
+            local_paths: List[str] = []
+            try:
+                # 本地服务器模式下改为写临时文件并以 file:// 路径引用
+                for i, data in uploads:
+                    path = await asyncio.to_thread(self._write_upload_file, data, f"photo{i}.jpg")
+                    local_paths.append(path)
+                    media[i]["media"] = Path(path).as_uri()
+                payload: Dict[str, Any] = {"chat_id": chat_id, "media": media}
+                if reply_parameters:
+                    payload["reply_parameters"] = reply_parameters
+                return await self._send("sendMediaGroup", chat_id, json=payload)
+            finally:
+                for path in local_paths:
+                    self._remove_upload_file(path)
+
+        def build_form() -> aiohttp.FormData:
+            form = aiohttp.FormData()
+            form.add_field("chat_id", str(chat_id))
+            form.add_field("media", json_codec.dumps(media))
+            if reply_parameters:
+                form.add_field("reply_parameters", json_codec.dumps(reply_parameters))
+            for i, data in uploads:
+                form.add_field(f"photo{i}", data, filename=f"photo{i}.jpg", content_type="image/jpeg")
+            return form
+
+        return await self._send("sendMediaGroup", chat_id, form=build_form)
 
     async def send_voice_by_bytes(
         self, chat_id: int | str, voice_bytes: bytes, caption: Optional[str] = None
     ) -> Dict[str, Any]:
-        session = await self.ensure_session()
-        form = aiohttp.FormData()
-        form.add_field("chat_id", str(chat_id))
-        if caption:
-            form.add_field("caption", caption)
-        form.add_field("voice", voice_bytes, filename="voice.ogg", content_type="audio/ogg")
-        async with session.post(
-            self._url("sendVoice"), data=form, proxy=self._http_proxy()
-        ) as resp:
-            return await resp.json()
+        return await self._send_upload("sendVoice", "voice", chat_id, voice_bytes, "voice.ogg", "audio/ogg", caption)
 
     async def send_video_by_url(self, chat_id: int | str, url: str, caption: Optional[str] = None) -> Dict[str, Any]:
-        session = await self.ensure_session()
         payload: Dict[str, Any] = {"chat_id": chat_id, "video": url}
         if caption:
             payload["caption"] = caption
-        async with session.post(
-            self._url("sendVideo"), json=payload, proxy=self._http_proxy()
-        ) as resp:
-            return await resp.json()
+        return await self._send("sendVideo", chat_id, json=payload)
 
     async def send_document_by_url(
         self, chat_id: int | str, url: str, caption: Optional[str] = None
     ) -> Dict[str, Any]:
-        session = await self.ensure_session()
         payload: Dict[str, Any] = {"chat_id": chat_id, "document": url}
         if caption:
             payload["caption"] = caption
-        async with session.post(
-            self._url("sendDocument"), json=payload, proxy=self._http_proxy()
-        ) as resp:
-            return await resp.json()
+        return await self._send("sendDocument", chat_id, json=payload)
 
     async def send_animation_by_bytes(
         self, chat_id: int | str, anim_bytes: bytes, caption: Optional[str] = None
     ) -> Dict[str, Any]:
-        session = await self.ensure_session()
-        form = aiohttp.FormData()
-        form.add_field("chat_id", str(chat_id))
+        return await self._send_upload(
+            "sendAnimation", "animation", chat_id, anim_bytes, "animation.gif", "image/gif", caption
+        )
+
+    async def send_animation_by_file_id(
+        self, chat_id: int | str, file_id: str, caption: Optional[str] = None
+    ) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"chat_id": chat_id, "animation": file_id}
         if caption:
-            form.add_field("caption", caption)
-        form.add_field("animation", anim_bytes, filename="animation.gif", content_type="image/gif")
-        async with session.post(
-            self._url("sendAnimation"), data=form, proxy=self._http_proxy()
-        ) as resp:
-            return await resp.json()
+            payload["caption"] = caption
+        return await self._send("sendAnimation", chat_id, json=payload)
+
+    async def _send_upload(
+        self,
+        method: str,
+        field: str,
+        chat_id: int | str,
+        data: bytes | bytearray,
+        filename: str,
+        content_type: str,
+        caption: Optional[str] = None,
+        reply_to: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        reply_parameters = {"message_id": reply_to} if reply_to is not None else None
+        if self._local_mode:
+            # 本地服务器可直接读取本机文件：写入临时文件后以 file:// 传路径，省去 multipart 上传
+            path = await asyncio.to_thread(self._write_upload_file, data, filename)
+            try:
+                payload: Dict[str, Any] = {"chat_id": chat_id, field: Path(path).as_uri()}
+                if caption:
+                    payload["caption"] = caption
+                if reply_parameters:
+                    payload["reply_parameters"] = reply_parameters
+                return await self._send(method, chat_id, json=payload)
+            finally:
+                self._remove_upload_file(path)
+
+        def build_form() -> aiohttp.FormData:
+            form = aiohttp.FormData()
+            form.add_field("chat_id", str(chat_id))
+            if caption:
+                form.add_field("caption", caption)
+            if reply_parameters:
+                form.add_field("reply_parameters", json_codec.dumps(reply_parameters))
+            form.add_field(field, data, filename=filename, content_type=content_type)
+            return form
+
+        return await self._send(method, chat_id, form=build_form)
+
+    def _write_upload_file(self, data: bytes | bytearray, filename: str) -> str:
+        os.makedirs(self._local_upload_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix="tg-upload-", suffix=Path(filename).suffix, dir=self._local_upload_dir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return path
+
+    @staticmethod
+    def _remove_upload_file(path: str) -> None:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    async def _send(
+        self,
+        method: str,
+        chat_id: int | str,
+        *,
+        json: Optional[Dict[str, Any]] = None,
+        form: Optional[Callable[[], aiohttp.FormData]] = None,
+    ) -> Dict[str, Any]:
+        # FormData 只能发送一次，重试时需要重新构建，因此这里接收构建函数
+        # multipart 上传携带完整媒体内容，按传输超时而非会话默认的 API 超时
+        extra: Dict[str, Any] = {"timeout": self._upload_timeout} if form is not None else {}
+
+        async def request() -> Dict[str, Any]:
+            session = await self.ensure_session()
+            async with session.post(
+                self._url(method),
+                json=json if form is None else None,
+                data=form() if form is not None else None,
+                proxy=self._http_proxy(),
+                **extra,
+            ) as resp:
+                return await self._read_json(resp)
+
+        if self._scheduler is None:
+            return await request()
+        return await self._scheduler.run(chat_id, request)
+
+    @staticmethod
+    async def _read_json(resp: aiohttp.ClientResponse) -> Dict[str, Any]:
+        # 直接解析响应字节，不经过 resp.json() 的 content-type 检查与编码猜测
+        return json_codec.loads(await resp.read())
 
     def _is_socks(self, proxy_url: Optional[str]) -> bool:
         if not proxy_url:
@@ -0,0 +1,108 @@
+"""精简的 update 解码：按 msgspec Struct 定义直接从响应字节解码，只保留适配器实际读取的字段，
+未声明的字段不会构造为 Python 对象。结果为普通 dict，下游代码无需区分。
+接收侧需要读取新的字段时，须同时加入下方的 Struct。
+
+需要可选依赖 msgspec（pip install msgspec）；未安装时 AVAILABLE 为 False，解码退化为完整解析。
+"""
+
+from typing import Any, Dict, List, Optional
+
+from . import json_codec
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - 可选依赖
+    msgspec = None
+
+AVAILABLE = msgspec is not None
+
+if msgspec is not None:
+
+    class _Struct(msgspec.Struct, omit_defaults=True):
+        pass
+
+    class User(_Struct):
+        id: int
+        is_bot: bool = False
+        first_name: Optional[str] = None
+        last_name: Optional[str] = None
+        username: Optional[str] = None
+
+    class Chat(_Struct):
+        id: int
+        type: Optional[str] = None
+        title: Optional[str] = None
+
+    class Entity(_Struct):
+        type: str
+        offset: int = 0
+        length: int = 0
+        user: Optional[User] = None
+
+    class File(_Struct):
+        file_id: str
+        file_unique_id: Optional[str] = None
+        file_size: Optional[int] = None
+
+    class Sticker(File):
+        is_animated: bool = False
+        is_video: bool = False
+
+    class Document(File):
+        file_name: Optional[str] = None
+
+    class Message(_Struct):
+        message_id: int
+        chat: Chat
+        date: int = 0
+        edit_date: Optional[int] = None
+        from_: Optional[User] = msgspec.field(default=None, name="from")
+        text: Optional[str] = None
+        caption: Optional[str] = None
+        entities: Optional[List[Entity]] = None
+        caption_entities: Optional[List[Entity]] = None
+        photo: Optional[List[File]] = None
+        sticker: Optional[Sticker] = None
+        animation: Optional[File] = None
+        voice: Optional[File] = None
+        document: Optional[Document] = None
+        reply_to_message: Optional["Message"] = None
+        media_group_id: Optional[str] = None
+
+    class Update(_Struct):
+        update_id: int
+        message: Optional[Message] = None
+        edited_message: Optional[Message] = None
+        channel_post: Optional[Message] = None
+        edited_channel_post: Optional[Message] = None
+
+    class UpdatesResponse(_Struct):
+        ok: bool
+        result: List[Update] = []
+        description: Optional[str] = None
+        error_code: Optional[int] = None
+        parameters: Optional[Dict[str, Any]] = None
+
+    _response_decoder = msgspec.json.Decoder(UpdatesResponse)
+    _update_decoder = msgspec.json.Decoder(Update)
+
+
+def decode_updates(raw: bytes) -> Dict[str, Any]:
+    """解码 getUpdates 响应体，result 中每个 update 只保留 Struct 中声明的字段"""
+    if msgspec is not None:
+        try:
+            return msgspec.to_builtins(_response_decoder.decode(raw))
+        except msgspec.ValidationError:
+            # 字段类型与声明不符（Bot API 变更等）时退回完整解析，不因此丢失整批 update
+            pass
+    return json_codec.loads(raw)
+
+
+def decode_update(raw: bytes) -> Any:
+    """解码 webhook 推送的单个 update"""
+    if msgspec is not None:
+        try:
+            return msgspec.to_builtins(_update_decoder.decode(raw))
+        except msgspec.ValidationError:
+            pass
+    return json_codec.loads(raw)
@@ -1,9 +1,40 @@
-import base64
-from typing import Optional
+import binascii
+from typing import List, Optional
 
+# Telegram 单条消息文本上限（按 UTF-16 码元计）
+TELEGRAM_TEXT_LIMIT = 4096
 
-def to_base64(data: bytes) -> str:
-    return base64.b64encode(data).decode("utf-8")
+
+class Base64StreamEncoder:
+    """增量 base64 编码：逐块编码写入预分配的缓冲区，无需先在内存中拼出完整原始数据"""
+
+    def __init__(self, size_hint: int = 0) -> None:
+        self._buf = bytearray(4 * ((size_hint + 2) // 3)) if size_hint > 0 else bytearray()
+        self._pos = 0
+        self._tail = b""
+
+    def update(self, chunk: bytes) -> None:
+        if self._tail:
+            chunk = self._tail + chunk
+        # 仅编码 3 字节对齐的部分，余下的留到下一块，保证拼接结果与整体编码一致
+        n = len(chunk) - len(chunk) % 3
+        self._tail = bytes(chunk[n:])
+        if n:
+            self._write(binascii.b2a_base64(memoryview(chunk)[:n], newline=False))
+
+    def finish(self) -> str:
+        if self._tail:
+            self._write(binascii.b2a_base64(self._tail, newline=False))
+            self._tail = b""
+        # size_hint 偏大时截掉多余的预分配空间
+        del self._buf[self._pos :]
+        return self._buf.decode("ascii")
+
+    def _write(self, encoded: bytes) -> None:
+        end = self._pos + len(encoded)
+        # 超出预分配长度时切片赋值会自动扩容
+        self._buf[self._pos : end] = encoded
+        self._pos = end
 
 
 def is_group_chat(chat_type: str) -> bool:
@@ -16,3 +47,39 @@ def pick_username(first_name: Optional[str], last_name: Optional[str], username:
     name = (first_name or "") + (f" {last_name}" if last_name else "")
     return name.strip() or "TG用户"
 
+
+def utf16_len(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _utf16_cut(text: str, limit: int) -> int:
+    """返回不超过 limit 个 UTF-16 码元的最长前缀长度（按 Python 字符计），不会切开代理对"""
+    units = 0
+    for i, ch in enumerate(text):
+        units += 2 if ord(ch) > 0xFFFF else 1
+        if units > limit:
+            return i
+    return len(text)
+
+
+def split_text(text: str, limit: int = TELEGRAM_TEXT_LIMIT) -> List[str]:
+    """按 Telegram 长度限制切分文本，优先在换行处断开，其次空白处，最后硬切"""
+    if len(text) <= limit // 2 or utf16_len(text) <= limit:
+        return [text] if text else []
+    chunks: List[str] = []
+    while text:
+        cut = _utf16_cut(text, limit)
+        if cut >= len(text):
+            chunks.append(text)
+            break
+        # 断点过于靠前会产生很碎的分片，此时直接硬切
+        brk = text.rfind("\n", 0, cut)
+        if brk < cut // 2:
+            brk = max(text.rfind(" ", 0, cut), text.rfind("\t", 0, cut))
+        if brk >= cut // 2:
+            chunk, text = text[:brk], text[brk + 1 :]
+        else:
+            chunk, text = text[:cut], text[cut:]
+        if chunk:
+            chunks.append(chunk)
+    return chunks
@@ -0,0 +1,68 @@
+import hmac
+from typing import Optional
+
+from aiohttp import web
+
+from . import json_codec, tg_schema
+from .logger import logger
+from .recv_handler.dispatcher import UpdateDispatcher
+from .recv_handler.update_tracker import UpdateTracker
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class TelegramWebhookServer:
+    """接收 Telegram webhook 推送的 update，并交给与轮询模式相同的派发器处理"""
+
+    def __init__(
+        self,
+        dispatcher: UpdateDispatcher,
+        *,
+        host: str = "0.0.0.0",
+        port: int = 8443,
+        path: str = "/telegram/webhook",
+        secret_token: Optional[str] = None,
+        tracker: Optional[UpdateTracker] = None,
+        compact_updates: bool = False,
+    ) -> None:
+        self.dispatcher = dispatcher
+        self.tracker = tracker
+        self.compact_updates = compact_updates and tg_schema.AVAILABLE
+        self.host = host
+        self.port = port
+        self.path = path if path.startswith("/") else f"/{path}"
+        self.secret_token = secret_token or None
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post(self.path, self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info(f"Webhook 服务已启动: http://{self.host}:{self.port}{self.path}")
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        if self.secret_token:
+            received = request.headers.get(SECRET_HEADER, "")
+            if not hmac.compare_digest(received.encode("utf-8"), self.secret_token.encode("utf-8")):
+                logger.warning(f"Webhook 请求 secret token 校验失败，来源: {request.remote}")
+                return web.Response(status=401)
+        try:
+            raw = await request.read()
+            update = tg_schema.decode_update(raw) if self.compact_updates else json_codec.loads(raw)
+        except Exception as e:
+            logger.warning(f"Webhook 请求体解析失败: {e}")
+            return web.Response(status=400)
+        if not isinstance(update, dict):
+            return web.Response(status=400)
+        # 入队即应答，处理在派发器中异步进行，避免 Telegram 侧超时重发；重发的 update 直接应答
+        if self.tracker is None or self.tracker.accept(update):
+            await self.dispatcher.submit(update)
+        return web.Response(status=200)
@@ -0,0 +1,23 @@
+"""src.config 在导入时读取工作目录下的 config.toml：测试在临时目录中以模板生成配置后再导入被测模块"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix="tg-adapter-test-")
+
+os.makedirs(os.path.join(WORKDIR, "template"))
+shutil.copy2(os.path.join(ROOT, "template", "template_config.toml"), os.path.join(WORKDIR, "template"))
+with open(os.path.join(ROOT, "template", "template_config.toml"), encoding="utf-8") as f:
+    config = f.read().replace('token = ""', 'token = "123:test"', 1)
+with open(os.path.join(WORKDIR, "config.toml"), "w", encoding="utf-8") as f:
+    f.write(config)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def pytest_sessionstart(session):
+    # 在确定测试路径之后再切换目录，测试模块在此之后才被导入
+    os.chdir(WORKDIR)
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+TOKEN = "123:test"
+
+
+class FakeBotApi:
+    """本地假 Bot API：记录收到的方法调用，按方法返回预设结果（errors 中的方法返回 ok=false）；
+    /file/ 下的下载请求由 files 提供内容"""
+
+    def __init__(self) -> None:
+        self.calls: List[Tuple[str, Dict[str, Any]]] = []
+        self.results: Dict[str, Any] = {}
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+        self.errors: Dict[str, Tuple[int, str]] = {}
+        # 方法 -> 应答前等待的秒数，模拟慢速链路
+        self.delays: Dict[str, float] = {}
+        self.files: Dict[str, bytes] = {}
+        self.base_url = ""
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post(f"/bot{TOKEN}/{{method}}", self._method)
+        app.router.add_get(f"/file/bot{TOKEN}/{{path:.+}}", self._file)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def methods(self) -> List[str]:
+        return [m for m, _ in self.calls]
+
+    async def _method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        if request.content_type == "multipart/form-data":
+            payload: Dict[str, Any] = {}
+            async for part in await request.multipart():
+                payload[part.name] = await part.read() if part.filename else await part.text()
+        else:
+            payload = await request.json() if request.can_read_body else {}
+        self.calls.append((method, payload))
+        if method in self.delays:
+            await asyncio.sleep(self.delays[method])
+        if method in self.errors:
+            code, description = self.errors[method]
+            return web.json_response({"ok": False, "error_code": code, "description": description})
+        if method in self.handlers:
+            return web.json_response({"ok": True, "result": self.handlers[method](payload)})
+        return web.json_response({"ok": True, "result": self.results.get(method, True)})
+
+    async def _file(self, request: web.Request) -> web.Response:
+        data = self.files.get(request.match_info["path"])
+        if data is None:
+            return web.Response(status=404)
+        return web.Response(body=data)
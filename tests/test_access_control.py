@@ -0,0 +1,64 @@
+import asyncio
+import os
+
+from src.config import global_config
+from src.recv_handler.access_control import AccessControl
+
+
+def _write_config(path, chat_section: str) -> None:
+    with open("config.toml", encoding="utf-8") as f:
+        text = f.read()
+    start = text.index("[chat]")
+    end = text.index("\n[", start + 1)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text[:start] + chat_section + text[end:])
+
+
+def test_reload_with_integer_reload_interval(tmp_path, monkeypatch):
+    monkeypatch.setattr(global_config, "chat", global_config.chat)
+    path = tmp_path / "config.toml"
+    _write_config(
+        path,
+        '[chat]\ngroup_list_type = "whitelist"\ngroup_list = [-100]\nprivate_list_type = "blacklist"\n'
+        "private_list = [7]\nban_user_id = [9]\nreload_interval = 0\n",
+    )
+
+    async def run() -> None:
+        control = AccessControl(global_config.chat, config_path=str(path))
+        assert await control.reload()
+        assert global_config.chat.reload_interval == 0.0
+        assert control.allow(1, -100, True)
+        assert not control.allow(1, -200, True)
+        assert not control.allow(7, 7, False)
+        assert not control.allow(9, -100, True)
+        assert control.stats() == {"group_not_whitelisted": 1, "private_blacklisted": 1, "user_banned": 1}
+        # 0 关闭轮询
+        control.start(global_config.chat.reload_interval)
+        assert control._watcher is None
+        await control.stop()
+
+    asyncio.run(run())
+
+
+def test_watcher_picks_up_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(global_config, "chat", global_config.chat)
+    path = tmp_path / "config.toml"
+    _write_config(path, '[chat]\ngroup_list_type = "whitelist"\ngroup_list = []\nreload_interval = 1\n')
+
+    async def run() -> None:
+        control = AccessControl(global_config.chat, config_path=str(path))
+        control.start(0.05)
+        try:
+            assert not control.allow(1, -100, True)
+            _write_config(path, '[chat]\ngroup_list_type = "whitelist"\ngroup_list = [-100]\nreload_interval = 1\n')
+            os.utime(path, (1, 1))
+            for _ in range(40):
+                if control.allow(1, -100, True):
+                    break
+                await asyncio.sleep(0.05)
+            else:
+                raise AssertionError("名单未重新加载")
+        finally:
+            await control.stop()
+
+    asyncio.run(run())
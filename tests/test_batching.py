@@ -0,0 +1,47 @@
+import asyncio
+
+from src.recv_handler.batching import KeyedBatcher
+
+
+def test_flush_matching_waits_for_in_flight_flush():
+    async def run() -> None:
+        events = []
+
+        async def flush(key, items):
+            events.append(("start", key))
+            await asyncio.sleep(0.05)
+            events.append(("end", key))
+
+        batcher = KeyedBatcher(flush, window=0.01, max_wait=0.01)
+        batcher.add((1, "album"), "part")
+        # 计时器已触发、flush 回调执行中
+        await asyncio.sleep(0.02)
+        assert events == [("start", (1, "album"))]
+        assert batcher
+        await batcher.flush_matching(lambda key: key[0] == 1)
+        events.append(("text", 1))
+        assert events == [("start", (1, "album")), ("end", (1, "album")), ("text", 1)]
+        assert not batcher
+
+    asyncio.run(run())
+
+
+def test_flush_processes_pending_batch_once():
+    async def run() -> None:
+        flushed = []
+
+        async def flush(key, items):
+            flushed.append((key, list(items)))
+
+        batcher = KeyedBatcher(flush, window=10, max_wait=10, max_items=3)
+        batcher.add("a", 1)
+        batcher.add("a", 2)
+        batcher.add("b", 1)
+        await batcher.flush("a")
+        batcher.add("a", 3)
+        await batcher.close()
+        await asyncio.sleep(0)
+        assert flushed[0] == ("a", [1, 2])
+        assert sorted(flushed[1:]) == [("a", [3]), ("b", [1])]
+
+    asyncio.run(run())
@@ -0,0 +1,18 @@
+import pytest
+
+from src.config.official_configs import GroupLoadSheddingConfig, TelegramBotConfig
+
+
+def test_integer_literals_are_accepted_for_float_fields():
+    cfg = TelegramBotConfig.from_dict({"token": "123:test", "edit_debounce": 0, "album_window": 1})
+    assert cfg.edit_debounce == 0.0 and isinstance(cfg.edit_debounce, float)
+    assert cfg.album_window == 1.0 and isinstance(cfg.album_window, float)
+    group = GroupLoadSheddingConfig.from_dict({"chat_id": -100, "window": 30, "sample_ratio": 1})
+    assert isinstance(group.window, float) and isinstance(group.sample_ratio, float)
+
+
+def test_float_and_bool_are_not_coerced_to_int():
+    with pytest.raises(TypeError):
+        TelegramBotConfig.from_dict({"token": "123:test", "dispatch_workers": 2.5})
+    with pytest.raises(TypeError):
+        TelegramBotConfig.from_dict({"token": "123:test", "edit_debounce": True})
@@ -0,0 +1,38 @@
+import asyncio
+
+from src.recv_handler.dispatcher import UpdateDispatcher
+
+
+def _update(update_id: int, chat_id: int) -> dict:
+    return {"update_id": update_id, "message": {"message_id": update_id, "chat": {"id": chat_id}}}
+
+
+def test_hot_chat_is_not_shed_and_only_the_global_limit_blocks():
+    async def run() -> None:
+        release = asyncio.Event()
+        handled = []
+        done = []
+
+        async def handle(update: dict) -> None:
+            await release.wait()
+            handled.append(update["update_id"])
+
+        dispatcher = UpdateDispatcher(handle, workers=2, max_pending=6, max_pending_per_chat=2, on_done=done.append)
+        dispatcher.start()
+        # 同一会话超出单会话上限：不丢弃、不等待，计入总上限
+        for i in range(5):
+            await asyncio.wait_for(dispatcher.submit(_update(i, 1)), 1)
+        await dispatcher.submit(_update(5, 2))
+        assert dispatcher.pending == 6 and dispatcher.hot_chats == 1 and done == []
+        # 总上限已满时等待
+        blocked = asyncio.create_task(dispatcher.submit(_update(6, 3)))
+        await asyncio.sleep(0.05)
+        assert not blocked.done()
+        release.set()
+        await asyncio.wait_for(blocked, 1)
+        assert await dispatcher.join(1)
+        assert [u for u in handled if u < 5] == [0, 1, 2, 3, 4]
+        assert sorted(u["update_id"] for u in done) == list(range(7))
+        await dispatcher.stop()
+
+    asyncio.run(run())
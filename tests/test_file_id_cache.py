@@ -0,0 +1,29 @@
+import pytest
+
+from src.send_handler.file_id_cache import is_stale_file_id_error
+
+
+@pytest.mark.parametrize(
+    "description",
+    [
+        "Bad Request: wrong file identifier/HTTP URL specified",
+        "Bad Request: wrong remote file identifier specified: Wrong character in the string",
+        "Bad Request: FILE_ID_INVALID",
+    ],
+)
+def test_stale_file_id_errors(description):
+    assert is_stale_file_id_error({"ok": False, "error_code": 400, "description": description})
+
+
+@pytest.mark.parametrize(
+    "result",
+    [
+        {"ok": False, "error_code": 400, "description": "Bad Request: message to be replied not found"},
+        {"ok": False, "error_code": 400, "description": "Bad Request: chat not found"},
+        {"ok": False, "error_code": 400},
+        {"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"},
+        {"ok": True, "result": {}},
+    ],
+)
+def test_other_errors_do_not_invalidate_cache(result):
+    assert not is_stale_file_id_error(result)
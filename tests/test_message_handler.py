@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+from src.config import global_config
+from src.recv_handler.dispatcher import UpdateDispatcher
+from src.recv_handler.message_handler import TelegramUpdateHandler
+from src.recv_handler.update_tracker import UpdateTracker
+
+
+def _album_part(update_id: int, chat_id: int = -100) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup"},
+            "media_group_id": "album-1",
+            "photo": [{"file_id": f"f{update_id}"}],
+        },
+    }
+
+
+def _edit(update_id: int, edit_date: int, chat_id: int = 42) -> dict:
+    return {
+        "update_id": update_id,
+        "edited_message": {
+            "message_id": 7,
+            "date": int(time.time()),
+            "edit_date": edit_date,
+            "chat": {"id": chat_id, "type": "private"},
+            "text": f"v{edit_date}",
+        },
+    }
+
+
+def test_batched_updates_are_committed_only_after_processing(monkeypatch):
+    tg_cfg = global_config.telegram_bot
+    monkeypatch.setattr(tg_cfg, "album_aggregation", True)
+    monkeypatch.setattr(tg_cfg, "album_window", 0.1)
+    monkeypatch.setattr(tg_cfg, "album_max_wait", 1.0)
+    monkeypatch.setattr(tg_cfg, "edit_debounce", 0.1)
+    monkeypatch.setattr(tg_cfg, "edit_max_wait", 1.0)
+
+    async def run() -> None:
+        handler = TelegramUpdateHandler(tg_client=None)
+        processed = []
+
+        async def fake_process(updates):
+            processed.append([u["update_id"] for u in updates])
+
+        handler._process = fake_process
+        tracker = UpdateTracker()
+        handler.on_done = tracker.done
+        dispatcher = UpdateDispatcher(handler.handle_update, workers=2, on_done=tracker.done)
+        dispatcher.start()
+        try:
+            for update in (_album_part(1), _album_part(2), _edit(3, 100), _edit(4, 101)):
+                assert tracker.accept(update)
+                await dispatcher.submit(update)
+            assert await dispatcher.join(1)
+            # 仍在聚合窗口内：派发器已处理完，但进度不能提交，否则崩溃后这些 update 不会重放
+            assert processed == []
+            assert tracker.stats()["pending"] == 4
+            await asyncio.sleep(0.3)
+            assert sorted(processed) == [[1, 2], [4]]
+            assert tracker.stats()["pending"] == 0
+        finally:
+            await dispatcher.stop()
+            await handler.close()
+            await tracker.close()
+
+    asyncio.run(run())
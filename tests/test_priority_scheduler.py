@@ -0,0 +1,123 @@
+import asyncio
+
+from src.recv_handler.outbound_buffer import OutboundBuffer
+from src.recv_handler.priority_scheduler import LANE_AMBIENT, LANE_MENTION, LANE_PRIVATE, PriorityScheduler
+
+WEIGHTS = {LANE_PRIVATE: 4, LANE_MENTION: 4, LANE_AMBIENT: 1}
+
+
+class FakeMaiBot:
+    """模拟 MessageSending：send 不阻塞，断线时进入 OutboundBuffer"""
+
+    def __init__(self) -> None:
+        self.connected = False
+        self.delivered = []
+
+        async def send(message) -> bool:
+            self.delivered.append(message)
+            return True
+
+        self.buffer = OutboundBuffer(send, lambda: self.connected, retry_interval=0.05)
+
+    def ready(self) -> bool:
+        return self.connected and not self.buffer.backlog
+
+    def scheduler(self, limits=None) -> PriorityScheduler:
+        limits = limits or {LANE_PRIVATE: 200, LANE_MENTION: 200, LANE_AMBIENT: 500}
+        return PriorityScheduler(self.buffer.submit, weights=WEIGHTS, limits=limits, ready=self.ready)
+
+
+async def _wait_for(predicate, timeout: float = 2) -> None:
+    for _ in range(int(timeout / 0.02)):
+        if predicate():
+            return
+        await asyncio.sleep(0.02)
+    raise AssertionError("等待超时")
+
+
+def test_mention_overtakes_ambient_backlog_while_maibot_is_down():
+    async def run() -> None:
+        maibot = FakeMaiBot()
+        scheduler = maibot.scheduler()
+        for i in range(50):
+            await scheduler.submit(LANE_AMBIENT, f"ambient-{i}")
+        await scheduler.submit(LANE_MENTION, "mention")
+        await asyncio.sleep(0.3)
+        # 断线期间消息留在优先级队列中，不进入先进先出的发送缓冲
+        assert maibot.delivered == [] and maibot.buffer.backlog == 0
+        assert scheduler.pending == 51
+        maibot.connected = True
+        await _wait_for(lambda: len(maibot.delivered) == 51)
+        assert maibot.delivered[0] == "mention"
+        assert maibot.delivered[1:] == [f"ambient-{i}" for i in range(50)]
+        await scheduler.close()
+
+    asyncio.run(run())
+
+
+def test_buffer_backlog_is_replayed_before_lanes_drain():
+    async def run() -> None:
+        maibot = FakeMaiBot()
+        # 断线前已交给发送缓冲的消息
+        await maibot.buffer.submit("buffered")
+        scheduler = maibot.scheduler()
+        await scheduler.submit(LANE_AMBIENT, "ambient")
+        await scheduler.submit(LANE_PRIVATE, "private")
+        maibot.connected = True
+        await _wait_for(lambda: len(maibot.delivered) == 3)
+        assert maibot.delivered == ["buffered", "private", "ambient"]
+        await scheduler.close()
+
+    asyncio.run(run())
+
+
+def test_full_lane_overflows_into_buffer_instead_of_blocking_while_down():
+    async def run() -> None:
+        maibot = FakeMaiBot()
+        scheduler = maibot.scheduler({LANE_PRIVATE: 2, LANE_MENTION: 2, LANE_AMBIENT: 2})
+        for i in range(3):
+            await asyncio.wait_for(scheduler.submit(LANE_MENTION, f"mention-{i}"), 1)
+        await scheduler.submit(LANE_AMBIENT, "ambient-0")
+        assert scheduler.stats()[LANE_MENTION]["overflowed"] == 1
+        assert maibot.buffer.backlog == 1
+        # 停止时未发出的消息按优先级交给发送缓冲
+        await scheduler.close()
+        assert scheduler.pending == 0
+        assert list(maibot.buffer._memory) == ["mention-0", "mention-1", "mention-2", "ambient-0"]
+        await maibot.buffer.close()
+
+    asyncio.run(run())
+
+
+def test_blocked_submit_overflows_when_maibot_disconnects_while_waiting():
+    async def run() -> None:
+        maibot = FakeMaiBot()
+        maibot.connected = True
+        gate = asyncio.Event()
+
+        async def slow_send(message) -> None:
+            if message == "mention-0":
+                await gate.wait()
+            await maibot.buffer.submit(message)
+
+        scheduler = PriorityScheduler(
+            slow_send, weights=WEIGHTS, limits={LANE_PRIVATE: 1, LANE_MENTION: 1, LANE_AMBIENT: 1}, ready=maibot.ready
+        )
+        # 第一条被 worker 取走并卡在发送中，第二条占满队列，第三条只能等待
+        await scheduler.submit(LANE_MENTION, "mention-0")
+        await asyncio.sleep(0.05)
+        await scheduler.submit(LANE_MENTION, "mention-1")
+        waiting = asyncio.create_task(scheduler.submit(LANE_MENTION, "mention-2"))
+        await asyncio.sleep(0.1)
+        assert not waiting.done()
+        # 等待期间 MaiBot 断开：不再一直等待，最早的一条转入发送缓冲
+        maibot.connected = False
+        await asyncio.wait_for(waiting, 1)
+        assert scheduler.stats()[LANE_MENTION]["overflowed"] == 1
+        assert list(maibot.buffer._memory) == ["mention-1"]
+        assert scheduler.stats()[LANE_MENTION]["queued"] == 1
+        gate.set()
+        await scheduler.close()
+        await maibot.buffer.close()
+
+    asyncio.run(run())
@@ -0,0 +1,77 @@
+import asyncio
+
+from src.rate_limit import SendScheduler, TokenBucket
+
+
+def _too_many_requests(retry_after) -> dict:
+    return {
+        "ok": False,
+        "error_code": 429,
+        "description": "Too Many Requests",
+        "parameters": {"retry_after": retry_after},
+    }
+
+
+def test_token_bucket_reservations_queue_up_in_order():
+    bucket = TokenBucket(rate=2, capacity=2)
+    now = 100.0
+    bucket._updated = now
+    assert [bucket.reserve(now) for _ in range(4)] == [0.0, 0.0, 0.5, 1.0]
+    assert not bucket.try_acquire(now + 1)
+    assert bucket.try_acquire(now + 2)
+
+
+def test_429_is_retried_after_retry_after_until_max_retries():
+    async def run() -> None:
+        scheduler = SendScheduler(global_per_second=1000, chat_per_second=1000, max_retries=3)
+        responses = [_too_many_requests(0.05), _too_many_requests(0.05), {"ok": True, "result": 1}]
+        calls = []
+
+        async def request() -> dict:
+            calls.append(asyncio.get_running_loop().time())
+            return responses[len(calls) - 1]
+
+        assert await scheduler.run(1, request) == {"ok": True, "result": 1}
+        assert len(calls) == 3 and scheduler.total_retries == 2
+        # 每次重试都等待了 retry_after
+        assert all(b - a >= 0.04 for a, b in zip(calls, calls[1:], strict=False))
+
+        attempts = 0
+
+        async def always_limited() -> dict:
+            nonlocal attempts
+            attempts += 1
+            return _too_many_requests(0.01)
+
+        result = await scheduler.run(2, always_limited)
+        assert result["error_code"] == 429
+        assert attempts == 4
+        assert scheduler.stats()["chats"]["2"]["retries"] == 3
+
+    asyncio.run(run())
+
+
+def test_sends_to_one_chat_keep_call_order_while_other_chats_proceed():
+    async def run() -> None:
+        scheduler = SendScheduler(global_per_second=1000, chat_per_second=1000, max_retries=1)
+        order = []
+        limited = {"first": True}
+
+        def make(chat: int, i: int):
+            async def request() -> dict:
+                # 会话 1 的第一条先遇到 429，后续消息也不能越过它
+                if chat == 1 and i == 0 and limited.pop("first", False):
+                    return _too_many_requests(0.1)
+                await asyncio.sleep(0.01 * (3 - i))
+                order.append((chat, i))
+                return {"ok": True}
+
+            return request
+
+        await asyncio.gather(*[scheduler.run(chat, make(chat, i)) for i in range(3) for chat in (1, 2)])
+        assert [i for chat, i in order if chat == 1] == [0, 1, 2]
+        assert [i for chat, i in order if chat == 2] == [0, 1, 2]
+        # 会话 2 不被会话 1 的限流拖住
+        assert order.index((2, 2)) < order.index((1, 0))
+
+    asyncio.run(run())
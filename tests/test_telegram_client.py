@@ -0,0 +1,114 @@
+import asyncio
+import base64
+import os
+
+import pytest
+
+from fake_bot_api import TOKEN, FakeBotApi
+from src.telegram_client import TelegramClient
+
+
+def test_multipart_upload_uses_upload_timeout():
+    async def run() -> None:
+        fake = FakeBotApi()
+        await fake.start()
+        fake.delays["sendPhoto"] = 0.5
+        fake.delays["sendMessage"] = 0.5
+        tg = TelegramClient(TOKEN, fake.base_url, api_timeout=0.2, upload_timeout=5.0)
+        try:
+            result = await tg.send_photo_by_bytes(1, b"\xff\xd8fake-jpeg", caption="c")
+            assert result["ok"]
+            method, payload = fake.calls[-1]
+            assert method == "sendPhoto"
+            assert payload["photo"] == b"\xff\xd8fake-jpeg"
+            assert payload["caption"] == "c"
+            # 普通 API 调用仍按 api_timeout
+            with pytest.raises(asyncio.TimeoutError):
+                await tg.send_message(1, "hi")
+        finally:
+            await tg.close()
+            await fake.stop()
+
+    asyncio.run(run())
+
+
+def test_local_mode_reads_files_from_disk_and_uploads_by_path(tmp_path):
+    served = tmp_path / "server"
+    served.mkdir()
+    voice = served / "voice" / "file_0.oga"
+    voice.parent.mkdir()
+    content = bytes(range(256)) * 1000
+    voice.write_bytes(content)
+    upload_dir = tmp_path / "uploads"
+
+    async def run() -> None:
+        fake = FakeBotApi()
+        await fake.start()
+        fake.results["getFile"] = {"file_id": "AwAC", "file_path": str(voice)}
+        seen_uploads = []
+
+        def check_upload(payload):
+            # 请求期间临时文件必须存在，且内容即为上传的字节
+            uris = [payload["photo"]] if "photo" in payload else [m["media"] for m in payload["media"]]
+            for uri in uris:
+                if not uri.startswith("file://"):
+                    continue
+                path = uri[len("file://") :]
+                assert os.path.dirname(path) == str(upload_dir)
+                seen_uploads.append((path, open(path, "rb").read()))
+            return {"message_id": 1}
+
+        fake.handlers["sendPhoto"] = check_upload
+        fake.handlers["sendMediaGroup"] = check_upload
+        tg = TelegramClient(
+            TOKEN, fake.base_url, local_mode=True, local_upload_dir=str(upload_dir), max_download_bytes=10
+        )
+        try:
+            file_path = await tg.get_file_path("AwAC")
+            assert file_path == str(voice)
+            # 本地模式不受 max_download_bytes 限制，也不经 /file/ 下载
+            tg.check_download_size(len(content))
+            assert await tg.download_file_base64(file_path, len(content)) == base64.b64encode(content).decode()
+
+            result = await tg.send_photo_by_bytes(7, b"photo-bytes", caption="cap")
+            assert result["ok"]
+            method, payload = fake.calls[-1]
+            assert payload["photo"].startswith("file://")
+            assert method == "sendPhoto" and payload["chat_id"] == 7 and payload["caption"] == "cap"
+
+            result = await tg.send_media_group(7, [b"one", "file-id-two", b"three"], caption="album", reply_to=3)
+            assert result["ok"]
+            method, payload = fake.calls[-1]
+            assert method == "sendMediaGroup"
+            assert payload["media"][1]["media"] == "file-id-two"
+            assert payload["media"][0]["caption"] == "album"
+            assert payload["reply_parameters"] == {"message_id": 3}
+        finally:
+            await tg.close()
+            await fake.stop()
+
+        assert [data for _, data in seen_uploads] == [b"photo-bytes", b"one", b"three"]
+        # 发送完成后临时文件被删除
+        assert not any(os.path.exists(path) for path, _ in seen_uploads)
+        assert [m for m, _ in fake.calls] == ["getFile", "sendPhoto", "sendMediaGroup"]
+
+    asyncio.run(run())
+
+
+def test_absolute_file_path_is_detected_without_local_mode(tmp_path):
+    sticker = tmp_path / "sticker.webp"
+    sticker.write_bytes(b"RIFF....WEBP")
+
+    async def run() -> None:
+        fake = FakeBotApi()
+        await fake.start()
+        tg = TelegramClient(TOKEN, fake.base_url)
+        try:
+            assert not tg.local_files
+            assert await tg.download_file_base64(str(sticker)) == base64.b64encode(b"RIFF....WEBP").decode()
+            assert tg.local_files
+        finally:
+            await tg.close()
+            await fake.stop()
+
+    asyncio.run(run())
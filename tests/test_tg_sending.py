@@ -0,0 +1,38 @@
+import asyncio
+import base64
+import json
+
+from maim_message import Seg
+
+from fake_bot_api import TOKEN, FakeBotApi
+from src.send_handler.tg_sending import TGMessageSender
+from src.telegram_client import TelegramClient
+
+
+def test_album_reduced_to_one_photo_keeps_reply_target():
+    async def run() -> None:
+        fake = FakeBotApi()
+        await fake.start()
+        fake.results["sendPhoto"] = {"message_id": 9, "photo": [{"file_id": "p"}]}
+        tg = TelegramClient(TOKEN, fake.base_url)
+        try:
+            sender = TGMessageSender(tg)
+            images = [
+                Seg(type="image", data=base64.b64encode(b"\xff\xd8only-valid").decode()),
+                Seg(type="image", data="不是base64"),
+            ]
+            result = await sender.send_image_group(5, images, caption="c", reply_to=3)
+            assert result["ok"]
+            method, payload = fake.calls[-1]
+            assert method == "sendPhoto"
+            # 相册中只剩一张可发送时退化为 sendPhoto，回复目标不能丢
+            assert json.loads(payload["reply_parameters"]) == {"message_id": 3}
+
+            await sender.send_image_group(5, [Seg(type="imageurl", data="https://example.com/a.jpg")], reply_to=4)
+            method, payload = fake.calls[-1]
+            assert method == "sendPhoto" and payload["reply_parameters"] == {"message_id": 4}
+        finally:
+            await tg.close()
+            await fake.stop()
+
+    asyncio.run(run())
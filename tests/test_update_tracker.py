@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+from src.recv_handler.update_tracker import UpdateTracker
+
+
+def _message(update_id: int) -> dict:
+    return {"update_id": update_id, "message": {"message_id": update_id, "chat": {"id": 1}, "text": "hi"}}
+
+
+def _edit(update_id: int, edit_date: int) -> dict:
+    return {"update_id": update_id, "edited_message": {"message_id": 5, "chat": {"id": 1}, "edit_date": edit_date}}
+
+
+def test_offset_pending_and_restore_survive_restart(tmp_path):
+    path = tmp_path / "state.json"
+
+    async def first_run() -> None:
+        tracker = UpdateTracker(persist_path=str(path), commit_interval=0.05)
+        for uid in (10, 11, 12):
+            assert tracker.accept(_message(uid))
+        tracker.done(_message(11))
+        assert tracker.next_offset == 13
+        # 定时提交后状态已落盘
+        await asyncio.sleep(0.2)
+        state = json.loads(path.read_text(encoding="utf-8"))
+        assert state["offset"] == 13
+        assert [u["update_id"] for u in state["pending"]] == [10, 12]
+        await tracker.close()
+
+    asyncio.run(first_run())
+
+    async def second_run() -> None:
+        tracker = UpdateTracker(persist_path=str(path))
+        assert tracker.next_offset == 13
+        assert [u["update_id"] for u in tracker.restore_pending()] == [10, 12]
+        # 已处理过的和待重放的 update 再次到达时都视为重复
+        assert not tracker.accept(_message(11))
+        assert not tracker.accept(_message(12))
+        assert tracker.accept(_message(13))
+        assert tracker.stats() == {"pending": 3, "duplicates": 2, "offset": 14}
+        await tracker.close()
+
+    asyncio.run(second_run())
+
+
+def test_edit_dedupe_survives_reload(tmp_path):
+    path = tmp_path / "state.json"
+
+    async def first_run() -> None:
+        tracker = UpdateTracker(persist_path=str(path))
+        assert tracker.accept(_edit(20, edit_date=1000))
+        tracker.done(_edit(20, edit_date=1000))
+        await tracker.close()
+
+    asyncio.run(first_run())
+
+    async def second_run() -> None:
+        tracker = UpdateTracker(persist_path=str(path))
+        assert tracker.restore_pending() == []
+        # 同一次编辑以新的 update_id 重发时仍被去重，新的编辑照常处理
+        assert not tracker.accept(_edit(21, edit_date=1000))
+        assert tracker.accept(_edit(22, edit_date=1001))
+        await tracker.close()
+
+    asyncio.run(second_run())
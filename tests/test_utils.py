@@ -0,0 +1,36 @@
+from src.utils import TELEGRAM_TEXT_LIMIT, split_text, utf16_len
+
+
+def test_split_text_counts_utf16_units_and_never_splits_surrogate_pairs():
+    emoji = "😀"
+    # 4095 个字符 + 1 个占两个码元的 emoji = 4097 码元，emoji 不能被切开
+    text = "a" * (TELEGRAM_TEXT_LIMIT - 1) + emoji
+    assert split_text(text) == ["a" * (TELEGRAM_TEXT_LIMIT - 1), emoji]
+
+    # 字符数不超过限制，但 UTF-16 码元数超过
+    text = emoji * 3000
+    chunks = split_text(text)
+    assert "".join(chunks) == text
+    assert [utf16_len(c) for c in chunks] == [TELEGRAM_TEXT_LIMIT, 6000 - TELEGRAM_TEXT_LIMIT]
+
+    exact = "a" * (TELEGRAM_TEXT_LIMIT - 2) + emoji
+    assert split_text(exact) == [exact]
+
+
+def test_split_text_prefers_newlines_then_spaces():
+    first = "x" * 3000
+    second = "y" * 3000
+    text = f"{first}\n{'w ' * 400}{second}"
+    chunks = split_text(text)
+    # 在换行处断开，分隔用的换行不保留
+    assert chunks[0] == first
+    assert all(utf16_len(c) <= TELEGRAM_TEXT_LIMIT for c in chunks)
+
+    words = " ".join(["word"] * 1000)
+    chunks = split_text(words)
+    assert all(not c.startswith(" ") and not c.endswith(" ") for c in chunks)
+    assert " ".join(chunks) == words
+
+    # 没有合适的断点时硬切
+    assert split_text("z" * 5000) == ["z" * TELEGRAM_TEXT_LIMIT, "z" * 904]
+    assert split_text("") == []
@@ -0,0 +1,121 @@
+import asyncio
+import socket
+
+import aiohttp
+
+import main
+from fake_bot_api import TOKEN, FakeBotApi
+from src.config import global_config
+from src.recv_handler.dispatcher import UpdateDispatcher
+from src.recv_handler.update_tracker import UpdateTracker
+from src.telegram_client import TelegramClient
+from src.webhook_server import SECRET_HEADER
+
+SECRET = "s3cret-token"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _update(update_id: int, chat_id: int = 42) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {"message_id": update_id, "date": 0, "chat": {"id": chat_id, "type": "private"}, "text": "hi"},
+    }
+
+
+def test_webhook_lifecycle_against_fake_bot_api(monkeypatch):
+    tg_cfg = global_config.telegram_bot
+    port = _free_port()
+    monkeypatch.setattr(tg_cfg, "webhook_url", "https://example.com/telegram/webhook")
+    monkeypatch.setattr(tg_cfg, "webhook_host", "127.0.0.1")
+    monkeypatch.setattr(tg_cfg, "webhook_port", port)
+    monkeypatch.setattr(tg_cfg, "webhook_secret_token", SECRET)
+    monkeypatch.setattr(tg_cfg, "allowed_updates", ["message"])
+
+    async def run() -> None:
+        fake = FakeBotApi()
+        await fake.start()
+        tg = TelegramClient(TOKEN, fake.base_url)
+        handled = []
+
+        async def handle(update):
+            handled.append(update["update_id"])
+
+        dispatcher = UpdateDispatcher(handle, workers=2)
+        dispatcher.start()
+        tracker = UpdateTracker()
+        server = await main.start_webhook(tg, dispatcher, tracker)
+        assert server is not None
+        try:
+            assert fake.methods() == ["setWebhook"]
+            payload = fake.calls[0][1]
+            assert payload["url"] == tg_cfg.webhook_url
+            assert payload["secret_token"] == SECRET
+            assert payload["allowed_updates"] == ["message"]
+
+            url = f"http://127.0.0.1:{port}{tg_cfg.webhook_path}"
+            async with aiohttp.ClientSession() as session:
+                async with session.post(url, json=_update(1), headers={SECRET_HEADER: "wrong"}) as resp:
+                    assert resp.status == 401
+                async with session.post(url, json=_update(2)) as resp:
+                    assert resp.status == 401
+                async with session.post(url, json=_update(3), headers={SECRET_HEADER: SECRET}) as resp:
+                    assert resp.status == 200
+                # Telegram 重发同一 update 时直接应答，不重复派发
+                async with session.post(url, json=_update(3), headers={SECRET_HEADER: SECRET}) as resp:
+                    assert resp.status == 200
+                async with session.post(url, data=b"not json", headers={SECRET_HEADER: SECRET}) as resp:
+                    assert resp.status == 400
+            assert await dispatcher.join(2)
+            assert handled == [3]
+        finally:
+            await main.stop_webhook(tg, server)
+            await dispatcher.stop()
+            await tracker.close()
+            await tg.close()
+            await fake.stop()
+
+        assert fake.methods() == ["setWebhook", "deleteWebhook"]
+        # 服务已关闭，端口不再接受连接
+        async with aiohttp.ClientSession() as session:
+            try:
+                async with session.post(f"http://127.0.0.1:{port}{tg_cfg.webhook_path}", json=_update(4)):
+                    raise AssertionError("webhook 服务未关闭")
+            except aiohttp.ClientConnectionError:
+                pass
+
+    asyncio.run(run())
+
+
+def test_set_webhook_failure_stops_server(monkeypatch):
+    tg_cfg = global_config.telegram_bot
+    port = _free_port()
+    monkeypatch.setattr(tg_cfg, "webhook_url", "https://example.com/telegram/webhook")
+    monkeypatch.setattr(tg_cfg, "webhook_host", "127.0.0.1")
+    monkeypatch.setattr(tg_cfg, "webhook_port", port)
+
+    async def run() -> None:
+        fake = FakeBotApi()
+        await fake.start()
+        fake.errors["setWebhook"] = (400, "Bad Request: bad webhook: HTTPS url must be provided for webhook")
+        tg = TelegramClient(TOKEN, fake.base_url)
+        dispatcher = UpdateDispatcher(lambda update: asyncio.sleep(0))
+        try:
+            assert await main.start_webhook(tg, dispatcher, None) is None
+            assert fake.methods() == ["setWebhook"]
+            # setWebhook 失败后本地监听已关闭
+            async with aiohttp.ClientSession() as session:
+                try:
+                    async with session.post(f"http://127.0.0.1:{port}{tg_cfg.webhook_path}", json=_update(1)):
+                        raise AssertionError("webhook 服务未关闭")
+                except aiohttp.ClientConnectionError:
+                    pass
+        finally:
+            await tg.close()
+            await fake.stop()
+
+    asyncio.run(run())